@@ -11,7 +11,7 @@ from trading.signal_generator import SignalGenerator
 from trading.risk_manager import RiskManager
 from trading.position_manager import PositionManager
 from trading.order_manager import OrderManager
-from ml.predictor import MLPredictor
+from ml.predictor import get_predictor
 from config import BackTest, mt5, BACKTEST_MODEL_SAVE_DIR
 from backtest_data_fetcher import BacktestDataFetcher
 from symbols import BACKTEST_SYMBOLS
@@ -73,7 +73,7 @@ class Backtester:
             self.ml_predictors = {}
             for symbol in symbols:
                 try:
-                    predictor = MLPredictor(
+                    predictor = get_predictor(
                         symbol=symbol,
                         backtest_mode=True,
                         backtest_date=self.start_date
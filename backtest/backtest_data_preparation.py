@@ -68,7 +68,8 @@ def prepare_training_data(df: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Opt
             return None, None, None
             
         logger.info(f"Final dataset: {len(X)} samples with {len(feature_columns)} features")
-        logger.info(f"Direction distribution: {y_direction.value_counts(normalize=True)}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Direction distribution: %s", y_direction.value_counts(normalize=True))
         
         return X, y_direction, y_return
         
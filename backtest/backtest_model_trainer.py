@@ -5,7 +5,6 @@ import pandas as pd
 import logging
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-import joblib
 from pathlib import Path
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout
@@ -14,6 +13,7 @@ from tensorflow.keras.callbacks import EarlyStopping
 from backtest_data_preparation import prepare_training_data
 from config import mt5, BACKTEST_MODEL_SAVE_DIR, BackTest
 from backtest_data_fetcher import BacktestDataFetcher
+from ml.model_storage import save_metadata, save_scaler
 
 class BacktestModelTrainer:
     def __init__(self, symbols: list, backtest_config: BackTest):
@@ -178,14 +178,14 @@ class BacktestModelTrainer:
                 
                 direction_model.save(str(model_base_path / f"{model_prefix}_direction_model.keras"))
                 return_model.save(str(model_base_path / f"{model_prefix}_return_model.keras"))
-                joblib.dump(scaler, model_base_path / f"{model_prefix}_scaler.pkl")
-                joblib.dump(metadata, model_base_path / f"{model_prefix}_metadata.pkl")
+                scaler_path = save_scaler(model_base_path, model_prefix, scaler.mean_, scaler.scale_)
+                metadata_path = save_metadata(model_base_path, model_prefix, metadata)
                 
                 trained_models[symbol] = {
                     'direction_model': str(model_base_path / f"{model_prefix}_direction_model.keras"),
                     'return_model': str(model_base_path / f"{model_prefix}_return_model.keras"),
-                    'scaler': str(model_base_path / f"{model_prefix}_scaler.pkl"),
-                    'metadata': str(model_base_path / f"{model_prefix}_metadata.pkl")
+                    'scaler': str(scaler_path),
+                    'metadata': str(metadata_path)
                 }
                 
                 self.logger.info(f"Successfully trained and saved models for {symbol}")
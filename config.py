@@ -95,6 +95,11 @@ class TradingConfig:
     MIN_PREDICTED_RETURN: float = 0.001
     MODEL_PREDICTION_LOOKBACK_PERIODS: int = 55
     MODEL_TRAINING_LOOKBACK_PERIOD: int = 1000
+    MODEL_INFERENCE_FP16: bool = False  # Run predictor models with float16 weights
+    MODEL_TRAINING_JOBS: int = 1  # >1 fits symbols in separate worker processes
+
+    # Signal Caching
+    SIGNAL_CACHE_MAX_TICKS: int = 12  # Recompute a cached signal after this many trader loops
 
     # Trade Direction Memory
     TRADE_DIRECTION_MEMORY_SIZE: int = 5
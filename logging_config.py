@@ -4,6 +4,8 @@ import logging
 import colorlog
 from datetime import datetime
 
+_logging_configured = False
+
 
 def setup_comprehensive_logging():
     """
@@ -11,7 +13,14 @@ def setup_comprehensive_logging():
     - Colored console output
     - File logging
     - Emoji-enhanced formatting
+
+    Only the first call installs handlers; every module calls this on import.
     """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
     # Create logger
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
@@ -1,14 +1,21 @@
 # main.py
 
+import asyncio
 import threading
 import statistics
 import time
 import signal
 import sys
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from symbols import SYMBOLS
-from config import initialize_mt5, SHUTDOWN_EVENT, mt5
+from config import (
+    initialize_mt5,
+    SHUTDOWN_EVENT,
+    mt5,
+    MT5Config,
+    TRADING_CONFIG,
+)
 from logging_config import (
     setup_comprehensive_logging,
     log_session_start,
@@ -20,13 +27,29 @@ from trading.order_manager import OrderManager
 from trading.position_manager import PositionManager
 from trading.signal_generator import SignalGenerator
 from trading.risk_manager import RiskManager
-from ml.predictor import MLPredictor
+from ml.predictor import get_predictor, BatchPredictor
 from ml.background_train import BackgroundTrainer
-from utils.market_utils import ensure_mt5_initialized
+from utils.market_utils import ensure_mt5_initialized, MarketSnapshot
 from trade_alerts import TradeAlerts
 
 setup_comprehensive_logging()
 
+# Pick a risk profile here, before any trading component is created
+# update_risk_profile('AGGRESSIVE')
+# update_risk_profile('MODERATE')
+# update_risk_profile('CONSERVATIVE')
+
+
+class SignalCache:
+    """Last signal computed for a symbol and the bar it was computed on"""
+
+    __slots__ = ("bar_time", "signal", "ticks")
+
+    def __init__(self):
+        self.bar_time = None
+        self.signal = None
+        self.ticks = 0
+
 
 class TradingBot:
     def __init__(self):
@@ -39,67 +62,128 @@ class TradingBot:
         self.order_manager = OrderManager()
         self.risk_manager = RiskManager()
         self.position_manager = PositionManager(self.order_manager, self.risk_manager)
+        # The MT5 API is not thread-safe, so trader calls go through one worker
+        self.mt5_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
+        self.market_snapshot = MarketSnapshot(executor=self.mt5_executor)
 
         # Create predictors for each symbol
-        self.ml_predictors = {symbol: MLPredictor(symbol) for symbol in SYMBOLS}
+        self.ml_predictors = {symbol: get_predictor(symbol) for symbol in SYMBOLS}
         self.signal_generators = {
             symbol: SignalGenerator(self.ml_predictors[symbol]) for symbol in SYMBOLS
         }
+        # One graph call predicts every symbol; each trader takes its result once
+        self.batch_predictor = BatchPredictor(
+            [self.ml_predictors[symbol] for symbol in SYMBOLS]
+        )
+        self._predictions = {}
+        self._predictions_bar_time = 0
 
-    def symbol_trader(self, symbol):
+    async def symbol_trader(self, symbol):
         """Individual symbol trading logic"""
-        logging.info(f"Starting trading thread for {symbol}")
+        logging.info(f"Starting trader for {symbol}")
+        loop = asyncio.get_running_loop()
+        signal_cache = SignalCache()
 
         while not SHUTDOWN_EVENT.is_set():
             try:
-                # Manage existing positions
-                self.position_manager.manage_open_positions(
-                    symbol, trading_state, self.trading_stats
+                # MT5 calls block, so each pass runs on the shared MT5 worker
+                await loop.run_in_executor(
+                    self.mt5_executor, self._trade_symbol_once, symbol, signal_cache
                 )
-
-                # Check for new trading opportunities
-                if (
-                    not SHUTDOWN_EVENT.is_set()
-                    and self.risk_manager.should_trade_symbol(symbol)
-                ):
-                    positions = mt5.positions_get(symbol=symbol)
-
-                    if not positions:
-                        signal, atr, potential_profit = self.signal_generators[
-                            symbol
-                        ].get_signal(symbol)
-
-                        if signal == "neutral" or SHUTDOWN_EVENT.is_set():
-                            continue
-
-                        if signal and atr and potential_profit > 0:
-                            state = trading_state.symbol_states[symbol]
-                            volume = self.risk_manager.calculate_position_size(
-                                symbol, atr, trading_state
-                            )
-
-                            success = self.order_manager.place_order(
-                                symbol,
-                                signal,
-                                atr,
-                                volume,
-                                self.trading_stats,
-                                is_ml_signal=True,
-                            )
-
-                            if success:
-                                state.last_trade_time = datetime.now()
-                            else:
-                                self._handle_failed_trade(state, symbol)
-
-                time.sleep(5)  #loop every 5 seconds
+                await asyncio.sleep(5)  #loop every 5 seconds
 
             except Exception as e:
                 if not SHUTDOWN_EVENT.is_set():
                     logging.error(f"Error in {symbol} trader: {e}")
-                time.sleep(1)
+                await asyncio.sleep(1)
 
-        logging.info(f"Trading thread for {symbol} has stopped")
+        logging.info(f"Trader for {symbol} has stopped")
+
+    def _trade_symbol_once(self, symbol, signal_cache):
+        """Run one pass of position management and signal handling for a symbol"""
+        state = trading_state.symbol_states[symbol]
+        positions = self.market_snapshot.positions(symbol)
+
+        # Manage existing positions
+        if self.position_manager.manage_open_positions(
+            symbol, state, self.trading_stats, positions
+        ):
+            # Our own closes and stop updates are not in the snapshot yet
+            self.market_snapshot.refresh()
+            positions = self.market_snapshot.positions(symbol)
+
+        # Check for new trading opportunities
+        if SHUTDOWN_EVENT.is_set() or not self.risk_manager.should_trade_symbol(state):
+            return
+
+        if positions:
+            # Position events change the symbol state the signal depends on
+            signal_cache.signal = None
+            return
+
+        # Signals only change with a new bar, so reuse the last one until then
+        bar_time = self._latest_bar_time(symbol)
+        if (
+            signal_cache.signal is None
+            or bar_time is None
+            or bar_time != signal_cache.bar_time
+            or signal_cache.ticks >= TRADING_CONFIG.SIGNAL_CACHE_MAX_TICKS
+        ):
+            signal_cache.signal = self.signal_generators[symbol].get_signal(
+                symbol,
+                state=state,
+                ml_prediction=self._ml_prediction(symbol, bar_time),
+            )
+            signal_cache.bar_time = bar_time
+            signal_cache.ticks = 0
+        else:
+            signal_cache.ticks += 1
+
+        signal, atr, potential_profit = signal_cache.signal
+
+        # Neutral signals carry no potential profit and are skipped here
+        if not (signal and atr and potential_profit > 0) or SHUTDOWN_EVENT.is_set():
+            return
+
+        volume = self.risk_manager.calculate_position_size(symbol, atr, trading_state)
+
+        success = self.order_manager.place_order(
+            symbol,
+            signal,
+            atr,
+            volume,
+            self.trading_stats,
+            is_ml_signal=True,
+        )
+
+        if success:
+            state.last_trade_ns = time.monotonic_ns()
+            # Let the next pass see the new position without waiting for a poll
+            self.market_snapshot.refresh()
+        else:
+            self._handle_failed_trade(state, symbol)
+        signal_cache.signal = None
+
+    async def _run_traders(self):
+        """Run every symbol trader on one event loop"""
+        await asyncio.gather(*(self.symbol_trader(symbol) for symbol in SYMBOLS))
+
+    def _ml_prediction(self, symbol, bar_time):
+        """Symbol's result from the shared batch, re-run once used or outdated"""
+        if symbol not in self._predictions or (
+            bar_time is not None and bar_time > self._predictions_bar_time
+        ):
+            self._predictions = self.batch_predictor.predict_all()
+            if bar_time is not None:
+                self._predictions_bar_time = bar_time
+        return self._predictions.pop(symbol)
+
+    def _latest_bar_time(self, symbol):
+        """Open time of the newest bar, or None if it cannot be fetched"""
+        rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates["time"][-1])
 
     def _handle_failed_trade(self, state, symbol):
         """Handle failed trade attempts"""
@@ -162,7 +246,7 @@ class TradingBot:
         return True
 
     def start_trading(self):
-        """Start trading threads for each symbol"""
+        """Start the symbol traders on a shared event loop"""
         # Start alerts system first if available
         if self.alerts:
             try:
@@ -172,18 +256,21 @@ class TradingBot:
                 logging.error(f"Failed to start trade alerts: {e}")
                 self.alerts = None  # Disable alerts if they fail to start
 
-        # Start symbol trading threads
-        for symbol in SYMBOLS:
-            thread = threading.Thread(target=self.symbol_trader, args=(symbol,))
-            thread.daemon = True
-            thread.start()
-            self.threads.append(thread)
+        # One poller serves open positions to every symbol trader
+        self.market_snapshot.start(SHUTDOWN_EVENT)
+
+        # All symbol traders share one event loop thread
+        thread = threading.Thread(
+            target=asyncio.run, args=(self._run_traders(),), daemon=True
+        )
+        thread.start()
+        self.threads.append(thread)
 
     def monitor_trading(self):
         """Monitor trading activity and account status"""
         try:
             while not SHUTDOWN_EVENT.is_set():
-                account = mt5.account_info()
+                account = self.mt5_executor.submit(mt5.account_info).result()
                 if account:
                     self._log_account_status(account)
                 time.sleep(1)
@@ -244,6 +331,8 @@ class TradingBot:
         # Wait for trading threads to finish
         for thread in self.threads:
             thread.join(timeout=5)
+        # Let any in-flight MT5 call finish before closing positions below
+        self.mt5_executor.shutdown(wait=True)
 
         total_profit = self._close_all_positions()
         logging.info(f"Total profit from closed positions: {total_profit}")
@@ -7,9 +7,9 @@ import logging
 from datetime import datetime, timedelta
 from ml.trainer import MLTrainer
 from logging_config import setup_comprehensive_logging
-import joblib
 from pathlib import Path
 from config import MODEL_SAVE_DIR, initialize_mt5
+from ml.model_storage import load_metadata, save_metadata, metadata_file, scaler_file
 
 setup_comprehensive_logging()
 
@@ -56,28 +56,30 @@ class BackgroundTrainer:
             for symbol in self.symbols:
                 # Check if model files exist
                 model_files = [
-                    f"{symbol}_direction_model.keras",
-                    f"{symbol}_return_model.keras",
-                    f"{symbol}_scaler.pkl",
-                    f"{symbol}_metadata.pkl",
+                    MODEL_SAVE_DIR / f"{symbol}_direction_model.keras",
+                    MODEL_SAVE_DIR / f"{symbol}_return_model.keras",
+                    scaler_file(MODEL_SAVE_DIR, symbol),
+                    metadata_file(MODEL_SAVE_DIR, symbol),
                 ]
 
-                for file in model_files:
-                    file_path = MODEL_SAVE_DIR / file
+                for file_path in model_files:
                     if not file_path.exists():
-                        self.logger.warning(f"❌ Missing model file: {file}")
+                        self.logger.warning(f"❌ Missing model file: {file_path.name}")
                         return False
 
                 # Check model age
-                metadata_path = MODEL_SAVE_DIR / f"{symbol}_metadata.pkl"
                 try:
-                    metadata = joblib.load(metadata_path)
+                    metadata = load_metadata(MODEL_SAVE_DIR, symbol)
                     training_time = metadata.get("training_time", None)
 
                     if not training_time:
                         self.logger.warning(f"⚠️ No training timestamp for {symbol}")
                         return False
 
+                    # JSON metadata stores the timestamp as an ISO string
+                    if isinstance(training_time, str):
+                        training_time = datetime.fromisoformat(training_time)
+
                     age = datetime.now() - training_time
                     if age > timedelta(minutes=self.max_model_age):
                         self.logger.warning(
@@ -116,11 +118,10 @@ class BackgroundTrainer:
 
             # Update metadata with training time
             for symbol in self.symbols:
-                metadata_path = MODEL_SAVE_DIR / f"{symbol}_metadata.pkl"
                 try:
-                    metadata = joblib.load(metadata_path)
+                    metadata = load_metadata(MODEL_SAVE_DIR, symbol)
                     metadata["training_time"] = datetime.now()
-                    joblib.dump(metadata, metadata_path)
+                    save_metadata(MODEL_SAVE_DIR, symbol, metadata)
                 except Exception as e:
                     self.logger.error(f"Error updating metadata for {symbol}: {str(e)}")
                     return False
@@ -230,9 +231,8 @@ class BackgroundTrainer:
 
             # Update metadata with new training time and data size
             for symbol in self.symbols:
-                metadata_path = MODEL_SAVE_DIR / f"{symbol}_metadata.pkl"
                 try:
-                    metadata = joblib.load(metadata_path)
+                    metadata = load_metadata(MODEL_SAVE_DIR, symbol)
                     metadata["training_time"] = datetime.now()
                     metadata["data_points"] = training_stats[
                         "data_points_by_symbol"
@@ -240,7 +240,7 @@ class BackgroundTrainer:
                     metadata["data_size_mb"] = training_stats[
                         "data_size_by_symbol_mb"
                     ].get(symbol, 0)
-                    joblib.dump(metadata, metadata_path)
+                    save_metadata(MODEL_SAVE_DIR, symbol, metadata)
                 except Exception as e:
                     self.logger.error(f"Error updating metadata for {symbol}: {str(e)}")
 
@@ -2,28 +2,40 @@
 
 import numpy as np
 import pandas as pd
+from typing import Union
 from .technical_indicators import TechnicalIndicators
+from .indicator_kernels import CORE_FEATURES, compute_core_features
 
 
 class FeatureEngineer:
     @staticmethod
-    def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
+    def engineer_features(rates: Union[np.ndarray, pd.DataFrame]) -> pd.DataFrame:
         """Advanced feature engineering with expanded indicator set"""
-        result = df.copy()
+        if isinstance(rates, np.ndarray):
+            # Structured MT5 rates: the frame is built once, no extra copy needed
+            result = pd.DataFrame(rates)
+            high, low, close = rates["high"], rates["low"], rates["close"]
+        else:
+            result = rates.copy()
+            high, low, close = result["high"], result["low"], result["close"]
+
+        # SMA_10/50, RSI, MACD, ATR and price changes in one compiled pass
+        core = compute_core_features(
+            np.ascontiguousarray(high, dtype=np.float64),
+            np.ascontiguousarray(low, dtype=np.float64),
+            np.ascontiguousarray(close, dtype=np.float64),
+        )
+        for i, name in enumerate(CORE_FEATURES):
+            result[name] = core[:, i]
 
         # Moving Averages
-        result["SMA_10"] = TechnicalIndicators.sma(result["close"], 10)
-        result["SMA_50"] = TechnicalIndicators.sma(result["close"], 50)
         result["EMA_20"] = TechnicalIndicators.ema(result["close"], 20)
 
         # Momentum Indicators
-        result["RSI"] = TechnicalIndicators.rsi(result["close"])
-        result["MACD"] = TechnicalIndicators.macd(result["close"])
         result["Stochastic"] = TechnicalIndicators.stochastic(result)
         result["Williams_R"] = TechnicalIndicators.williams_r(result)
 
         # Volatility Indicators
-        result["ATR"] = TechnicalIndicators.atr(result)
         result["Bollinger_Band_Width"] = TechnicalIndicators.bollinger_band_width(
             result
         )
@@ -37,8 +49,6 @@ class FeatureEngineer:
         result["MFI"] = TechnicalIndicators.money_flow_index(result)
 
         # Advanced Price Change Features
-        result["price_change_1"] = result["close"].pct_change()
-        result["price_change_5"] = result["close"].pct_change(5)
         result["price_change_volatility"] = (
             result["price_change_1"].rolling(window=10).std()
         )
@@ -48,22 +58,22 @@ class FeatureEngineer:
             result["close"] / result["close"].rolling(window=50).mean()
         )
 
-        # Target Features
-        result["future_close"] = result["close"].shift(-1)
-        result["target_return"] = (result["future_close"] - result["close"]) / result[
-            "close"
-        ]
+        # Target Features: next-bar return without the shifted future_close column
+        close = result["close"].to_numpy(dtype=np.float64)
+        target_return = np.empty_like(close)
+        target_return[:-1] = close[1:] / close[:-1] - 1
+        target_return[-1] = np.nan
+        result["target_return"] = target_return
 
         # Multi-threshold classification target
+        upper, lower = np.nanquantile(target_return, [0.7, 0.3])
         result["target_direction"] = np.select(
             [
-                result["target_return"]
-                > result["target_return"].quantile(0.7),  # Top 30% positive
-                result["target_return"]
-                < result["target_return"].quantile(0.3),  # Bottom 30% negative
+                target_return > upper,  # Top 30% positive
+                target_return < lower,  # Bottom 30% negative
             ],
             [1, -1],
             default=0,  # Neutral movement
-        )
+        ).astype(np.int8)
 
         return result
@@ -0,0 +1,233 @@
+# ml/features/indicator_kernels.py
+
+import functools
+import numpy as np
+from utils.jit_utils import NUMBA_AVAILABLE, njit
+
+# Column order of the matrix returned by compute_core_features
+CORE_FEATURES = [
+    "SMA_10",
+    "SMA_50",
+    "RSI",
+    "MACD",
+    "ATR",
+    "price_change_1",
+    "price_change_5",
+]
+
+
+@njit(cache=True)
+def compute_core_features(high, low, close):
+    """Compute the core price indicators in a single pass over the bars.
+
+    Matches TechnicalIndicators with default periods: SMA 10/50, Wilder RSI 14,
+    MACD histogram 12/26/9, ATR 14 and 1/5 bar percentage changes.
+    """
+    n = close.shape[0]
+    out = np.full((n, 7), np.nan)
+    if n == 0:
+        return out
+
+    rsi_alpha = 1.0 / 14
+    fast_alpha = 2.0 / 13
+    slow_alpha = 2.0 / 27
+    signal_alpha = 2.0 / 10
+
+    sum_10 = 0.0
+    sum_50 = 0.0
+    sum_tr = 0.0
+    true_ranges = np.empty(n)
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+    ema_fast = close[0]
+    ema_slow = close[0]
+    signal = 0.0
+
+    for i in range(n):
+        price = close[i]
+
+        # Simple moving averages
+        sum_10 += price
+        sum_50 += price
+        if i >= 10:
+            sum_10 -= close[i - 10]
+        if i >= 50:
+            sum_50 -= close[i - 50]
+        if i >= 9:
+            out[i, 0] = sum_10 / 10
+        if i >= 49:
+            out[i, 1] = sum_50 / 50
+
+        # RSI with Wilder smoothing
+        if i > 0:
+            delta = price - close[i - 1]
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            avg_gain = (1 - rsi_alpha) * avg_gain + rsi_alpha * gain
+            avg_loss = (1 - rsi_alpha) * avg_loss + rsi_alpha * loss
+        if avg_loss > 0:
+            out[i, 2] = 100 - 100 / (1 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            out[i, 2] = 100.0
+
+        # MACD histogram
+        if i > 0:
+            ema_fast = (1 - fast_alpha) * ema_fast + fast_alpha * price
+            ema_slow = (1 - slow_alpha) * ema_slow + slow_alpha * price
+        macd = ema_fast - ema_slow
+        if i == 0:
+            signal = macd
+        else:
+            signal = (1 - signal_alpha) * signal + signal_alpha * macd
+        out[i, 3] = macd - signal
+
+        # Average True Range
+        true_range = high[i] - low[i]
+        if i > 0:
+            true_range = max(
+                true_range,
+                abs(high[i] - close[i - 1]),
+                abs(low[i] - close[i - 1]),
+            )
+        true_ranges[i] = true_range
+        sum_tr += true_range
+        if i >= 14:
+            sum_tr -= true_ranges[i - 14]
+        if i >= 13:
+            out[i, 4] = sum_tr / 14
+
+        # Percentage price changes
+        if i >= 1:
+            out[i, 5] = price / close[i - 1] - 1
+        if i >= 5:
+            out[i, 6] = price / close[i - 5] - 1
+
+    return out
+
+
+# Keys of the dict built from compute_signal_state
+SIGNAL_INDICATORS = ["ATR", "RSI", "MACD", "Stochastic", "Williams_R"]
+
+
+@functools.lru_cache(maxsize=8)
+def signal_state_kernel(period=14, fast=12, slow=26, signal=9):
+    """Build a compiled signal-state kernel specialised on the indicator periods.
+
+    The periods are closure constants, so Numba compiles them in as literals.
+    The kernel returns the latest ATR, RSI, MACD histogram, Stochastic and
+    Williams %R, matching the last row of the TechnicalIndicators series.
+    """
+    rsi_alpha = 1.0 / period
+    fast_alpha = 2.0 / (fast + 1)
+    slow_alpha = 2.0 / (slow + 1)
+    signal_alpha = 2.0 / (signal + 1)
+
+    @njit
+    def kernel(high, low, close):
+        n = close.shape[0]
+        atr = rsi = macd_hist = stochastic = williams_r = np.nan
+        if n == 0:
+            return atr, rsi, macd_hist, stochastic, williams_r
+
+        avg_gain = 0.0
+        avg_loss = 0.0
+        ema_fast = close[0]
+        ema_slow = close[0]
+        signal_line = 0.0
+
+        # Wilder RSI and MACD are recurrences over the whole window
+        for i in range(n):
+            price = close[i]
+            if i > 0:
+                delta = price - close[i - 1]
+                gain = delta if delta > 0 else 0.0
+                loss = -delta if delta < 0 else 0.0
+                avg_gain = (1 - rsi_alpha) * avg_gain + rsi_alpha * gain
+                avg_loss = (1 - rsi_alpha) * avg_loss + rsi_alpha * loss
+                ema_fast = (1 - fast_alpha) * ema_fast + fast_alpha * price
+                ema_slow = (1 - slow_alpha) * ema_slow + slow_alpha * price
+            macd = ema_fast - ema_slow
+            if i == 0:
+                signal_line = macd
+            else:
+                signal_line = (1 - signal_alpha) * signal_line + signal_alpha * macd
+
+        if avg_loss > 0:
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            rsi = 100.0
+        macd_hist = macd - signal_line
+
+        if n < period:
+            return atr, rsi, macd_hist, stochastic, williams_r
+
+        # ATR, Stochastic and Williams %R only need the last `period` bars
+        sum_tr = 0.0
+        highest = high[n - period]
+        lowest = low[n - period]
+        for i in range(n - period, n):
+            true_range = high[i] - low[i]
+            if i > 0:
+                true_range = max(
+                    true_range,
+                    abs(high[i] - close[i - 1]),
+                    abs(low[i] - close[i - 1]),
+                )
+            sum_tr += true_range
+            highest = max(highest, high[i])
+            lowest = min(lowest, low[i])
+
+        atr = sum_tr / period
+        price_range = highest - lowest
+        if price_range > 0:
+            stochastic = 100 * (close[n - 1] - lowest) / price_range
+            williams_r = (highest - close[n - 1]) / price_range * -100
+
+        return atr, rsi, macd_hist, stochastic, williams_r
+
+    return kernel
+
+
+# Default periods used by the signal generator (ATR/RSI/Stochastic 14, MACD 12/26/9)
+compute_signal_state = signal_state_kernel()
+
+
+@njit(cache=True)
+def _mean_true_range_jit(high, low, close):
+    """Average true range over every bar that has a previous close.
+
+    The first bar only supplies the previous close, like the NaN row a
+    shifted pandas true range skips when taking the mean.
+    """
+    n = close.shape[0]
+    if n < 2:
+        return np.nan
+
+    sum_tr = 0.0
+    for i in range(1, n):
+        sum_tr += max(
+            high[i] - low[i],
+            abs(high[i] - close[i - 1]),
+            abs(low[i] - close[i - 1]),
+        )
+    return sum_tr / (n - 1)
+
+
+def _mean_true_range_numpy(high, low, close):
+    """Vectorised true-range mean, used when Numba is not installed"""
+    if close.shape[0] < 2:
+        return np.nan
+
+    high = high[1:]
+    low = low[1:]
+    prev_close = close[:-1]
+    true_range = np.maximum(
+        high - low,
+        np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)),
+    )
+    return float(true_range.mean())
+
+
+# Without Numba the interpreted loop is much slower than whole-array NumPy
+mean_true_range = _mean_true_range_jit if NUMBA_AVAILABLE else _mean_true_range_numpy
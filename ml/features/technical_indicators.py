@@ -5,6 +5,15 @@ import pandas as pd
 from typing import Tuple
 
 
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """Trailing rolling mean, NaN until the first full window"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(values, period)
+        result[period - 1 :] = windows.mean(axis=1)
+    return result
+
+
 class TechnicalIndicators:
     @staticmethod
     def sma(prices: pd.Series, period: int = 10) -> pd.Series:
@@ -16,13 +25,26 @@ class TechnicalIndicators:
         """Calculate Exponential Moving Average"""
         return prices.ewm(span=span, adjust=False).mean()
 
+    @staticmethod
+    def pct_change(prices: pd.Series, periods: int = 1) -> pd.Series:
+        """Calculate percentage change over a number of periods"""
+        values = prices.to_numpy(dtype=np.float64)
+        change = np.full_like(values, np.nan)
+        change[periods:] = values[periods:] / values[:-periods] - 1
+        return pd.Series(change, index=prices.index)
+
     @staticmethod
     def rsi(prices: pd.Series, periods: int = 14) -> pd.Series:
-        """Calculate Relative Strength Index"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=periods).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=periods).mean()
-        rs = gain / loss
+        """Calculate Relative Strength Index using Wilder's smoothing"""
+        values = prices.to_numpy(dtype=np.float64)
+        delta = np.zeros_like(values)
+        np.subtract(values[1:], values[:-1], out=delta[1:])
+        # fmax treats a missing price change as no gain and no loss
+        gain = pd.Series(np.fmax(delta, 0.0), index=prices.index)
+        loss = pd.Series(np.fmax(-delta, 0.0), index=prices.index)
+        avg_gain = gain.ewm(alpha=1 / periods, adjust=False).mean()
+        avg_loss = loss.ewm(alpha=1 / periods, adjust=False).mean()
+        rs = avg_gain / avg_loss
         return 100 - (100 / (1 + rs))
 
     @staticmethod
@@ -39,11 +61,14 @@ class TechnicalIndicators:
     @staticmethod
     def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
         """Calculate Average True Range"""
-        high_low = df["high"] - df["low"]
-        high_close = np.abs(df["high"] - df["close"].shift())
-        low_close = np.abs(df["low"] - df["close"].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        return ranges.max(axis=1).rolling(window=period).mean()
+        high = df["high"].to_numpy()
+        low = df["low"].to_numpy()
+        prev_close = df["close"].shift().to_numpy()
+        # fmax skips the NaN previous close on the first row, like max(axis=1)
+        true_range = np.fmax.reduce(
+            [high - low, np.abs(high - prev_close), np.abs(low - prev_close)]
+        )
+        return pd.Series(true_range, index=df.index).rolling(window=period).mean()
 
     @staticmethod
     def stochastic(df: pd.DataFrame, period: int = 14) -> pd.Series:
@@ -83,31 +108,26 @@ class TechnicalIndicators:
     @staticmethod
     def adx(df: pd.DataFrame, period: int = 14) -> pd.Series:
         """Calculate Average Directional Index"""
-        high_diff = pd.Series(df["high"]).diff()
-        low_diff = -pd.Series(df["low"]).diff()
-
-        plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0)
-        minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0)
-
-        true_range = pd.DataFrame(
-            {
-                "h-l": df["high"] - df["low"],
-                "h-pc": np.abs(df["high"] - df["close"].shift()),
-                "l-pc": np.abs(df["low"] - df["close"].shift()),
-            }
-        ).max(axis=1)
-
-        plus_di = 100 * (
-            pd.Series(plus_dm).rolling(window=period).mean()
-            / true_range.rolling(window=period).mean()
-        )
-        minus_di = 100 * (
-            pd.Series(minus_dm).rolling(window=period).mean()
-            / true_range.rolling(window=period).mean()
+        high = df["high"].to_numpy(dtype=np.float64)
+        low = df["low"].to_numpy(dtype=np.float64)
+        close = df["close"].to_numpy(dtype=np.float64)
+
+        high_diff = np.diff(high, prepend=np.nan)
+        low_diff = -np.diff(low, prepend=np.nan)
+        plus_dm = np.where((high_diff > low_diff) & (high_diff > 0), high_diff, 0.0)
+        minus_dm = np.where((low_diff > high_diff) & (low_diff > 0), low_diff, 0.0)
+
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        true_range = np.fmax.reduce(
+            [high - low, np.abs(high - prev_close), np.abs(low - prev_close)]
         )
 
-        adx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
-        return pd.Series(adx).rolling(window=period).mean()
+        mean_tr = _rolling_mean(true_range, period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plus_di = 100 * _rolling_mean(plus_dm, period) / mean_tr
+            minus_di = 100 * _rolling_mean(minus_dm, period) / mean_tr
+            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        return pd.Series(_rolling_mean(dx, period), index=df.index)
 
     @staticmethod
     def cci(df: pd.DataFrame, period: int = 20) -> pd.Series:
@@ -183,8 +203,8 @@ class TechnicalIndicators:
         result["MFI"] = cls.money_flow_index(result)
 
         # Price Changes
-        result["price_change_1"] = result["close"].pct_change()
-        result["price_change_5"] = result["close"].pct_change(5)
+        result["price_change_1"] = cls.pct_change(result["close"])
+        result["price_change_5"] = cls.pct_change(result["close"], 5)
         result["price_change_volatility"] = (
             result["price_change_1"].rolling(window=10).std()
         )
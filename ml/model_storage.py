@@ -0,0 +1,74 @@
+# ml/model_storage.py
+
+import json
+import joblib
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+
+def scaler_file(model_dir: Path, model_prefix: str) -> Path:
+    """Path of the stored scaler, falling back to the legacy pickle if present"""
+    path = model_dir / f"{model_prefix}_scaler.npz"
+    legacy_path = model_dir / f"{model_prefix}_scaler.pkl"
+    return legacy_path if not path.exists() and legacy_path.exists() else path
+
+
+def metadata_file(model_dir: Path, model_prefix: str) -> Path:
+    """Path of the stored metadata, falling back to the legacy pickle if present"""
+    path = model_dir / f"{model_prefix}_metadata.json"
+    legacy_path = model_dir / f"{model_prefix}_metadata.pkl"
+    return legacy_path if not path.exists() and legacy_path.exists() else path
+
+
+def save_scaler(model_dir: Path, model_prefix: str, mean, scale) -> Path:
+    """Store feature scaling statistics as a raw NumPy archive"""
+    path = model_dir / f"{model_prefix}_scaler.npz"
+    np.savez(path, mean=np.asarray(mean), scale=np.asarray(scale))
+    return path
+
+
+def load_scaler(model_dir: Path, model_prefix: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Load (mean, scale) arrays, reading legacy StandardScaler pickles if needed"""
+    path = scaler_file(model_dir, model_prefix)
+    if not path.exists():
+        raise FileNotFoundError(f"Scaler file not found: {path}")
+
+    if path.suffix == ".pkl":
+        scaler = joblib.load(path)
+        return scaler.mean_, scaler.scale_
+
+    with np.load(path) as data:
+        return data["mean"], data["scale"]
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def save_metadata(model_dir: Path, model_prefix: str, metadata: Dict[str, Any]) -> Path:
+    """Store model metadata as JSON"""
+    path = model_dir / f"{model_prefix}_metadata.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, default=_to_json, indent=2)
+    return path
+
+
+def load_metadata(model_dir: Path, model_prefix: str) -> Dict[str, Any]:
+    """Load model metadata, reading legacy pickles if needed"""
+    path = metadata_file(model_dir, model_prefix)
+    if not path.exists():
+        raise FileNotFoundError(f"Metadata file not found: {path}")
+
+    if path.suffix == ".pkl":
+        return joblib.load(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
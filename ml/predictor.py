@@ -1,7 +1,9 @@
 import tensorflow as tf
-import joblib
+import numpy as np
 import logging
-from typing import Tuple, Optional
+import functools
+import threading
+from typing import Dict, Optional, Sequence, Tuple
 from config import (
     mt5,
     MODEL_SAVE_DIR,
@@ -12,6 +14,7 @@ from config import (
 )
 from utils.market_utils import fetch_historical_data
 from utils.calculation_utils import prepare_prediction_data
+from ml.model_storage import load_metadata, load_scaler, scaler_file
 from pathlib import Path
 from datetime import datetime
 
@@ -20,6 +23,17 @@ from logging_config import setup_comprehensive_logging
 setup_comprehensive_logging()
 
 
+def _to_float16(model):
+    """Clone an inference-only Keras model with float16 layers and weights"""
+
+    def half_layer(layer):
+        return layer.__class__.from_config({**layer.get_config(), "dtype": "float16"})
+
+    half_model = tf.keras.models.clone_model(model, clone_function=half_layer)
+    half_model.set_weights([w.astype(np.float16) for w in model.get_weights()])
+    return half_model
+
+
 class MLPredictor:
     def __init__(
         self,
@@ -32,15 +46,31 @@ class MLPredictor:
         self.backtest_date = backtest_date
         self.direction_model = None
         self.return_model = None
-        self.scaler = None
         self.features = None
+        self._mean = None
+        self._scale = None
 
         self.load_models()
 
-        self.predict_direction = tf.function(
-            self._predict_direction, reduce_retracing=True
+        # Reused FP32 input row, filled in place on every prediction
+        self._buf = np.zeros((1, len(self.features)), dtype=np.float32)
+
+        # Both heads run in one XLA-compiled graph call on a single row, so the
+        # fully pinned signature traces exactly one concrete function
+        self._joint_fn = tf.function(
+            self._predict_joint,
+            input_signature=[tf.TensorSpec([1, len(self.features)], tf.float32)],
+            jit_compile=True,
         )
-        self.predict_return = tf.function(self._predict_return, reduce_retracing=True)
+
+        # Trace once up front and call the concrete function directly, skipping
+        # the tf.function trace-cache lookup on every prediction
+        self._concrete = self._joint_fn.get_concrete_function(
+            tf.TensorSpec([1, len(self.features)], tf.float32)
+        )
+
+        # Warm up once so XLA compilation happens outside the trading loop
+        self._concrete(tf.convert_to_tensor(self._buf))
 
     def _get_model_paths(self) -> Tuple[Path, str]:
         """Get the model directory and prefix based on mode and symbol"""
@@ -66,17 +96,13 @@ class MLPredictor:
             model_dir, model_prefix = self._get_model_paths()
 
             # Load metadata first to get feature names
-            metadata_path = model_dir / f"{model_prefix}_metadata.pkl"
-            if not metadata_path.exists():
-                raise FileNotFoundError(f"Metadata file not found: {metadata_path}")
-
-            metadata = joblib.load(metadata_path)
+            metadata = load_metadata(model_dir, model_prefix)
             self.features = metadata.get("features", [])
 
             # Define model file paths
             direction_model_path = model_dir / f"{model_prefix}_direction_model.keras"
             return_model_path = model_dir / f"{model_prefix}_return_model.keras"
-            scaler_path = model_dir / f"{model_prefix}_scaler.pkl"
+            scaler_path = scaler_file(model_dir, model_prefix)
 
             # Check if all required files exist
             for path in [direction_model_path, return_model_path, scaler_path]:
@@ -86,7 +112,15 @@ class MLPredictor:
             # Load models
             self.direction_model = tf.keras.models.load_model(str(direction_model_path))
             self.return_model = tf.keras.models.load_model(str(return_model_path))
-            self.scaler = joblib.load(scaler_path)
+
+            if TRADING_CONFIG.MODEL_INFERENCE_FP16:
+                self.direction_model = _to_float16(self.direction_model)
+                self.return_model = _to_float16(self.return_model)
+            mean, scale = load_scaler(model_dir, model_prefix)
+
+            # Scaler statistics as graph constants so scaling runs inside TF
+            self._mean = tf.constant(mean, dtype=tf.float32)
+            self._scale = tf.constant(scale, dtype=tf.float32)
 
             logging.info(
                 f"Models loaded for {self.symbol} "
@@ -104,22 +138,19 @@ class MLPredictor:
             logging.error(f"Error loading models for {self.symbol}: {str(e)}")
             raise
 
-    def _predict_direction(self, scaled_features):
-        """Dedicated method for direction prediction"""
-        return self.direction_model(scaled_features)
-
-    def _predict_return(self, scaled_features):
-        """Dedicated method for return prediction"""
-        return self.return_model(scaled_features)
+    def _predict_joint(self, features):
+        """Scale raw features and run direction and return models on them"""
+        scaled_features = (features - self._mean) / self._scale
+        # Outputs are cast back so float16 models look identical to callers
+        return (
+            tf.cast(self.direction_model(scaled_features, training=False), tf.float32),
+            tf.cast(self.return_model(scaled_features, training=False), tf.float32),
+        )
 
-    def predict(
-        self,
-        timeframe=None,
-        look_back=None,
-        threshold=None,
-        current_time: Optional[datetime] = None,
-    ) -> Tuple[Optional[str], float, float]:
-        """Predict trading signal and potential return"""
+    def _load_feature_row(
+        self, timeframe=None, look_back=None, current_time: Optional[datetime] = None
+    ) -> bool:
+        """Fetch recent bars and write the latest feature row into the input buffer"""
         # Set default parameters based on mode
         if timeframe is None:
             timeframe = (
@@ -131,14 +162,13 @@ class MLPredictor:
                 if self.backtest_mode
                 else TRADING_CONFIG.MODEL_PREDICTION_LOOKBACK_PERIODS
             )
-        if threshold is None:
-            threshold = TRADING_CONFIG.HIGH_CONFIDENCE_THRESHOLD
 
-        if not all(
-            [self.direction_model, self.return_model, self.scaler, self.features]
+        if (
+            not all([self.direction_model, self.return_model, self.features])
+            or self._mean is None
         ):
             logging.error("Models not loaded. Cannot predict.")
-            return None, 0, 0
+            return False
 
         # Fetch historical data based on mode
         if self.backtest_mode and current_time:
@@ -149,39 +179,162 @@ class MLPredictor:
             rates_frame = fetch_historical_data(self.symbol, timeframe, look_back)
 
         if rates_frame is None:
-            return None, 0, 0
+            return False
 
-        try:
-            # Extract features ensuring exact column names and order
-            features_df = prepare_prediction_data(rates_frame, self.features)
+        # Extract features ensuring exact column names and order
+        features_df = prepare_prediction_data(rates_frame, self.features)
 
-            # If no features remain, return neutral
-            if features_df is None or len(features_df) == 0:
-                logging.info(f"{self.symbol} insufficient data for prediction")
-                return None, 0, 0
+        # If no features remain, return neutral
+        if features_df is None or len(features_df) == 0:
+            logging.info(f"{self.symbol} insufficient data for prediction")
+            return False
 
-            # Scale features
-            scaled_features = self.scaler.transform(features_df)
+        # Only the latest bar is predicted; scaling happens inside the graph
+        self._buf[0] = features_df.iloc[-1].to_numpy()
+        return True
 
-            # Predict direction and return
-            direction_prob = self.predict_direction(
-                tf.convert_to_tensor(scaled_features, dtype=tf.float32)
-            )[0][0].numpy()
+    @staticmethod
+    def _interpret(
+        direction_prob: float, predicted_return: float, threshold=None
+    ) -> Tuple[Optional[str], float, float]:
+        """Map model outputs to a trading signal"""
+        if threshold is None:
+            threshold = TRADING_CONFIG.HIGH_CONFIDENCE_THRESHOLD
 
-            predicted_return = self.predict_return(
-                tf.convert_to_tensor(scaled_features, dtype=tf.float32)
-            )[0][0].numpy()
+        if direction_prob > threshold:
+            signal = "buy"
+        elif direction_prob < (1 - threshold):
+            signal = "sell"
+        else:
+            signal = "hold"
 
-            # Interpret predictions
-            if direction_prob > threshold:
-                signal = "buy"
-            elif direction_prob < (1 - threshold):
-                signal = "sell"
-            else:
-                signal = "hold"
+        return signal, direction_prob, predicted_return
 
-            return signal, direction_prob, predicted_return
+    def predict(
+        self,
+        timeframe=None,
+        look_back=None,
+        threshold=None,
+        current_time: Optional[datetime] = None,
+    ) -> Tuple[Optional[str], float, float]:
+        """Predict trading signal and potential return"""
+        try:
+            if not self._load_feature_row(timeframe, look_back, current_time):
+                return None, 0, 0
+
+            direction, returns = self._concrete(tf.convert_to_tensor(self._buf))
+            return self._interpret(
+                float(direction[0, 0]), float(returns[0, 0]), threshold
+            )
 
         except Exception as e:
             logging.error(f"Prediction error: {e}")
             return None, 0, 0
+
+
+class BatchPredictor:
+    """Run every symbol's models on its latest row in one compiled graph call.
+
+    The graph has a fixed [n_symbols, n_features] signature and a validity
+    mask, so it is traced and compiled once however many symbols have fresh
+    features on a given bar.
+    """
+
+    def __init__(self, predictors: Sequence[MLPredictor]):
+        self.predictors = tuple(predictors)
+        feature_counts = {len(predictor.features) for predictor in self.predictors}
+        if len(feature_counts) != 1:
+            raise ValueError("Batched predictors must share one feature set")
+
+        n_symbols, n_features = len(self.predictors), feature_counts.pop()
+        self._batch = np.zeros((n_symbols, n_features), dtype=np.float32)
+        self._valid = np.zeros(n_symbols, dtype=bool)
+
+        self._concrete = tf.function(
+            self._predict_all, jit_compile=True
+        ).get_concrete_function(
+            tf.TensorSpec([n_symbols, n_features], tf.float32),
+            tf.TensorSpec([n_symbols], tf.bool),
+        )
+
+        # Warm up once so XLA compilation happens outside the trading loop
+        self._concrete(
+            tf.convert_to_tensor(self._batch), tf.convert_to_tensor(self._valid)
+        )
+
+    def _predict_all(self, batch, valid):
+        """Run each predictor on its own row; masked rows come back neutral"""
+        directions, returns = [], []
+        for i, predictor in enumerate(self.predictors):
+            direction, predicted_return = predictor._predict_joint(batch[i : i + 1])
+            directions.append(direction)
+            returns.append(predicted_return)
+
+        mask = valid[:, tf.newaxis]
+        return (
+            tf.where(mask, tf.concat(directions, axis=0), 0.5),
+            tf.where(mask, tf.concat(returns, axis=0), 0.0),
+        )
+
+    def predict_all(
+        self, threshold=None, current_time: Optional[datetime] = None
+    ) -> Dict[str, Tuple[Optional[str], float, float]]:
+        """Predict the latest bar for every symbol with a single graph call"""
+        results = {predictor.symbol: (None, 0, 0) for predictor in self.predictors}
+
+        for i, predictor in enumerate(self.predictors):
+            try:
+                self._valid[i] = predictor._load_feature_row(current_time=current_time)
+            except Exception as e:
+                logging.error(f"Prediction error for {predictor.symbol}: {e}")
+                self._valid[i] = False
+            if self._valid[i]:
+                self._batch[i] = predictor._buf[0]
+
+        try:
+            if not self._valid.any():
+                return results
+
+            directions, returns = self._concrete(
+                tf.convert_to_tensor(self._batch), tf.convert_to_tensor(self._valid)
+            )
+            directions, returns = directions.numpy(), returns.numpy()
+            for i, predictor in enumerate(self.predictors):
+                if self._valid[i]:
+                    results[predictor.symbol] = MLPredictor._interpret(
+                        float(directions[i, 0]), float(returns[i, 0]), threshold
+                    )
+
+        except Exception as e:
+            logging.error(f"Batch prediction error: {e}")
+
+        return results
+
+
+# lru_cache does not hold a lock while building a value, so concurrent symbol
+# threads could otherwise load the same models twice
+_predictor_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_predictor(
+    symbol: str, backtest_mode: bool, backtest_date: Optional[datetime]
+) -> MLPredictor:
+    return MLPredictor(symbol, backtest_mode=backtest_mode, backtest_date=backtest_date)
+
+
+def get_predictor(
+    symbol: str,
+    backtest_mode: bool = False,
+    backtest_date: Optional[datetime] = None,
+) -> MLPredictor:
+    """Return a long-lived predictor for the symbol, loading its models only once.
+
+    Reusing the instance also keeps its tf.function trace cache warm across
+    predictions. Backtest dates are truncated to the hour, matching the
+    granularity of the saved model files.
+    """
+    if backtest_date is not None:
+        backtest_date = backtest_date.replace(minute=0, second=0, microsecond=0)
+    with _predictor_lock:
+        return _cached_predictor(symbol, backtest_mode, backtest_date)
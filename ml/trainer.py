@@ -1,14 +1,16 @@
 # ml/trainer.py
 
 import pandas as pd
+import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 from imblearn.over_sampling import SMOTE
 import joblib
+from joblib import Parallel, delayed
 from pathlib import Path
 import logging
 import os
 from utils.market_utils import fetch_historical_data
+from ml.model_storage import save_metadata, save_scaler
 from utils.calculation_utils import prepare_training_data
 from config import mt5, MODEL_SAVE_DIR, MT5Config, TRADING_CONFIG
 from symbols import SYMBOLS as symbols
@@ -49,18 +51,16 @@ class MLTrainer:
 
     def prepare_data(self, symbol):
         self.logger.info(f"📥 Preparing data for {symbol}")
-        df = fetch_historical_data(symbol, self.timeframe, self.look_back)
+        rates = fetch_historical_data(symbol, self.timeframe, self.look_back)
 
-        if df is None:
+        if rates is None:
             self.logger.warning(f"⚠️ No historical data retrieved for {symbol}")
             return None, None, None
 
-        data_size_mb = df.memory_usage(deep=True).sum() / (
-            1024 * 1024
-        )  # Convert bytes to MB
+        data_size_mb = rates.nbytes / (1024 * 1024)  # Convert bytes to MB
 
         # Track data points and size for this symbol
-        data_points = len(df)
+        data_points = len(rates)
         self.training_stats["total_data_points"] += data_points
         self.training_stats["total_data_size_mb"] += data_size_mb
         self.training_stats["data_points_by_symbol"][symbol] = data_points
@@ -72,7 +72,7 @@ class MLTrainer:
             Size: {data_size_mb:.2f} MB"""
         )
 
-        return prepare_training_data(df)
+        return prepare_training_data(rates)
 
 
     def train_models(self):
@@ -92,194 +92,22 @@ class MLTrainer:
         self.training_stats["data_points_by_symbol"] = {}
         self.training_stats["data_size_by_symbol_mb"] = {}
 
-        for symbol in self.symbols:
-            symbol_start_time = time.time()
-            self.logger.info(f"\n{'='*50}")
-            self.logger.info(f"⚡ Training models for {symbol}")
-            self.logger.info(f"{'='*50}")
+        # The MT5 client is not thread-safe, so history is fetched on this thread
+        datasets = [(symbol, self._fetch_symbol_data(symbol)) for symbol in self.symbols]
 
-            try:
-                X, y_direction, y_return = self.prepare_data(symbol)
-
-                # Additional safety checks
-                if X is None or len(X) == 0:
-                    self.logger.warning(
-                        f"""❌ Skipping {symbol}:
-                        Reason: Insufficient or invalid data
-                        Data shape: X={None if X is None else X.shape}"""
-                    )
-                    self.training_stats['skipped_symbols'] += 1
-                    continue
-
-                # If only one class exists, skip this symbol
-                if len(y_direction.unique()) < 2:
-                    self.logger.warning(
-                        f"""❌ Skipping {symbol}:
-                        Reason: Only one class present
-                        Classes: {y_direction.unique()}"""
-                    )
-                    self.training_stats["skipped_symbols"] += 1
-                    continue
-
-                self.logger.info(
-                    f"""📊 {symbol} Data Summary:
-                    Samples: {len(X)}
-                    Features: {len(X.columns)}
-                    Class Distribution: {dict(y_direction.value_counts(normalize=True))}"""
-                )
-
-                # Apply SMOTE for balancing
-                try:
-                    self.logger.info(f"⚖️ Applying SMOTE balancing for {symbol}")
-
-                    smote = SMOTE(random_state=42)
-                    X_resampled, y_direction_resampled = smote.fit_resample(
-                        X, y_direction
-                    )
-
-                    y_return_resampled = pd.Series(
-                        list(y_return) * ((len(X_resampled) // len(y_return)) + 1)
-                    )[: len(X_resampled)]
-
-                    # Split the resampled data
-                    (
-                        X_train,
-                        X_test,
-                        y_dir_train,
-                        y_dir_test,
-                        y_ret_train,
-                        y_ret_test,
-                    ) = train_test_split(
-                        X_resampled,
-                        y_direction_resampled,
-                        y_return_resampled,
-                        test_size=0.2,
-                        random_state=42,
-                    )
-
-                    # Scale features
-                    scaler = StandardScaler()
-                    X_train_scaled = scaler.fit_transform(X_train)
-                    X_test_scaled = scaler.transform(X_test)
-
-                    # Perform hyperparameter optimization for direction model
-                    best_direction_model, best_direction_params = perform_hyperparameter_optimization(
-                        X_train_scaled, y_dir_train, "direction"
-                    )
-
-                    # Perform hyperparameter optimization for return model
-                    best_return_model, best_return_params = perform_hyperparameter_optimization(
-                        X_train_scaled, y_ret_train, "return"
-                    )
-
-                    # Save hyperparameter optimization results
-                    optimization_results = {
-                        "direction_model": {
-                            "best_params": best_direction_params,
-                            "training_history": best_direction_model.history.history if hasattr(best_direction_model, 'history') else None
-                        },
-                        "return_model": {
-                            "best_params": best_return_params,
-                            "training_history": best_return_model.history.history if hasattr(best_return_model, 'history') else None
-                        }
-                    }
-
-                    model_path = Path(MODEL_SAVE_DIR)
-
-                    joblib.dump(
-                        optimization_results,
-                        model_path / f"{symbol}_optimization_results.pkl"
-                    )
-
-                    # Evaluate models
-                    dir_loss, dir_accuracy = best_direction_model.evaluate(
-                        X_test_scaled, y_dir_test, verbose=0
-                    )
-                    ret_loss, ret_mae = best_return_model.evaluate(
-                        X_test_scaled, y_ret_test, verbose=0
-                    )
-
-                    self.logger.info(f"Direction Model - Test Accuracy: {dir_accuracy:.4f}")
-                    self.logger.info(f"Return Model - Test MAE: {ret_mae:.4f}")
-
-                    # Save the best models
-                    best_direction_model.save(str(model_path / f"{symbol}_direction_model.keras"))
-                    best_return_model.save(str(model_path / f"{symbol}_return_model.keras"))
-                    joblib.dump(scaler, model_path / f"{symbol}_scaler.pkl")
-
-                    # Save model metadata
-                    model_metadata = {
-                        "features": X.columns.tolist(),
-                        "direction_model_params": best_direction_params,
-                        "return_model_params": best_return_params,
-                        "direction_model_performance": {
-                            "accuracy": dir_accuracy,
-                            "loss": dir_loss,
-                        },
-                        "return_model_performance": {"mae": ret_mae, "loss": ret_loss},
-                        "training_timestamp": datetime.now().isoformat(),  # Add training completion timestamp
-                        "training_duration_seconds": time.time() - symbol_start_time,
-                    }
-
-                    os.makedirs(MODEL_SAVE_DIR, exist_ok=True)
-
-                    try:
-                        joblib.dump(
-                            model_metadata,
-                            model_path / f"{symbol}_metadata.pkl"
-                        )
-                    except Exception as e:
-                        self.logger.error(
-                            f"Error saving metadata for {symbol}: {str(e)}"
-                        )
-                        raise  
-
-                    self.logger.info(
-                        f"✅ Saved metadata for {symbol} with training timestamp"
-                    )
-
-                    self.logger.info(
-                        f"""✨ {symbol} Direction Model Results:
-                        Accuracy: {dir_accuracy:.4f}
-                        Loss: {dir_loss:.4f}"""
-                    )
-
-                    self.logger.info(
-                        f"""📈 {symbol} Return Model Results:
-                        MAE: {ret_mae:.4f}
-                        Loss: {ret_loss:.4f}"""
-                    )
-
-                    training_time = time.time() - symbol_start_time
-                    self.training_stats["training_times"][symbol] = {
-                        "time": training_time,
-                        "accuracy": dir_accuracy,
-                        "mae": ret_mae
-                    }
-                    self.training_stats["trained_symbols"] += 1
-
-                    self.logger.info(
-                        f"""✅ {symbol} Training Complete:
-                        Time: {training_time:.2f} seconds"""
-                    )
-
-                except Exception as e:
-                    self.logger.error(
-                        f"""💥 Training Error - {symbol}:
-                        Error: {str(e)}""",
-                        exc_info=True,
-                    )
-                    self.training_stats["failed_symbols"] += 1
-                    continue
+        n_jobs = min(len(datasets), TRADING_CONFIG.MODEL_TRAINING_JOBS, os.cpu_count() or 1)
+        if n_jobs > 1:
+            # Each loky worker is its own process with a separate TensorFlow runtime
+            outcomes = Parallel(n_jobs=n_jobs, backend="loky")(
+                delayed(self._train_symbol)(symbol, data) for symbol, data in datasets
+            )
+        else:
+            outcomes = [self._train_symbol(symbol, data) for symbol, data in datasets]
 
-            except Exception as e:
-                self.logger.error(
-                    f"""🚨 Process Error - {symbol}:
-                    Error: {str(e)}""",
-                    exc_info=True,
-                )
-                self.training_stats["failed_symbols"] += 1
-                continue
+        for (symbol, _), (status, metrics) in zip(datasets, outcomes):
+            self.training_stats[f"{status}_symbols"] += 1
+            if metrics is not None:
+                self.training_stats["training_times"][symbol] = metrics
 
         self.training_stats["end_time"] = datetime.now()
         total_time = (
@@ -342,6 +170,212 @@ class MLTrainer:
         self.logger.info(f"{'='*50}")
         self.logger.info("🏁 Model training completed!")
 
+    def _fetch_symbol_data(self, symbol):
+        """Prepare training data for a symbol, or None if fetching it failed"""
+        try:
+            return self.prepare_data(symbol)
+        except Exception as e:
+            self.logger.error(
+                f"""🚨 Process Error - {symbol}:
+                Error: {str(e)}""",
+                exc_info=True,
+            )
+            return None
+
+    def _train_symbol(self, symbol, data):
+        """Train and save the direction and return models for one symbol.
+
+        Returns the outcome ("trained", "skipped" or "failed") with the
+        symbol's metrics, so stats are only updated by the calling process.
+        """
+        if data is None:
+            return "failed", None
+
+        symbol_start_time = time.time()
+        self.logger.info(f"\n{'='*50}")
+        self.logger.info(f"⚡ Training models for {symbol}")
+        self.logger.info(f"{'='*50}")
+
+        try:
+            X, y_direction, y_return = data
+
+            # Additional safety checks
+            if X is None or len(X) == 0:
+                self.logger.warning(
+                    f"""❌ Skipping {symbol}:
+                    Reason: Insufficient or invalid data
+                    Data shape: X={None if X is None else X.shape}"""
+                )
+                return "skipped", None
+
+            # If only one class exists, skip this symbol
+            if len(y_direction.unique()) < 2:
+                self.logger.warning(
+                    f"""❌ Skipping {symbol}:
+                    Reason: Only one class present
+                    Classes: {y_direction.unique()}"""
+                )
+                return "skipped", None
+
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    f"""📊 {symbol} Data Summary:
+                    Samples: {len(X)}
+                    Features: {len(X.columns)}
+                    Class Distribution: {dict(y_direction.value_counts(normalize=True))}"""
+                )
+
+            # Apply SMOTE for balancing
+            try:
+                self.logger.info(f"⚖️ Applying SMOTE balancing for {symbol}")
+
+                smote = SMOTE(random_state=42)
+                X_resampled, y_direction_resampled = smote.fit_resample(
+                    X, y_direction
+                )
+
+                y_return_resampled = pd.Series(
+                    list(y_return) * ((len(X_resampled) // len(y_return)) + 1)
+                )[: len(X_resampled)]
+
+                # Split the resampled data
+                (
+                    X_train,
+                    X_test,
+                    y_dir_train,
+                    y_dir_test,
+                    y_ret_train,
+                    y_ret_test,
+                ) = train_test_split(
+                    X_resampled,
+                    y_direction_resampled,
+                    y_return_resampled,
+                    test_size=0.2,
+                    random_state=42,
+                )
+
+                # Scale features with the training statistics (same as StandardScaler)
+                X_train = np.asarray(X_train, dtype=np.float64)
+                feature_mean = X_train.mean(axis=0)
+                feature_scale = X_train.std(axis=0)
+                feature_scale[feature_scale == 0] = 1.0
+                X_train_scaled = ((X_train - feature_mean) / feature_scale).astype(np.float32)
+                X_test_scaled = (
+                    (np.asarray(X_test, dtype=np.float64) - feature_mean) / feature_scale
+                ).astype(np.float32)
+
+                # Perform hyperparameter optimization for direction model
+                best_direction_model, best_direction_params = perform_hyperparameter_optimization(
+                    X_train_scaled, y_dir_train, "direction"
+                )
+
+                # Perform hyperparameter optimization for return model
+                best_return_model, best_return_params = perform_hyperparameter_optimization(
+                    X_train_scaled, y_ret_train, "return"
+                )
+
+                # Save hyperparameter optimization results
+                optimization_results = {
+                    "direction_model": {
+                        "best_params": best_direction_params,
+                        "training_history": best_direction_model.history.history if hasattr(best_direction_model, 'history') else None
+                    },
+                    "return_model": {
+                        "best_params": best_return_params,
+                        "training_history": best_return_model.history.history if hasattr(best_return_model, 'history') else None
+                    }
+                }
+
+                model_path = Path(MODEL_SAVE_DIR)
+
+                joblib.dump(
+                    optimization_results,
+                    model_path / f"{symbol}_optimization_results.pkl"
+                )
+
+                # Evaluate models
+                dir_loss, dir_accuracy = best_direction_model.evaluate(
+                    X_test_scaled, y_dir_test, verbose=0
+                )
+                ret_loss, ret_mae = best_return_model.evaluate(
+                    X_test_scaled, y_ret_test, verbose=0
+                )
+
+                self.logger.info(f"Direction Model - Test Accuracy: {dir_accuracy:.4f}")
+                self.logger.info(f"Return Model - Test MAE: {ret_mae:.4f}")
+
+                # Save the best models
+                best_direction_model.save(str(model_path / f"{symbol}_direction_model.keras"))
+                best_return_model.save(str(model_path / f"{symbol}_return_model.keras"))
+                save_scaler(model_path, symbol, feature_mean, feature_scale)
+
+                # Save model metadata
+                model_metadata = {
+                    "features": X.columns.tolist(),
+                    "direction_model_params": best_direction_params,
+                    "return_model_params": best_return_params,
+                    "direction_model_performance": {
+                        "accuracy": dir_accuracy,
+                        "loss": dir_loss,
+                    },
+                    "return_model_performance": {"mae": ret_mae, "loss": ret_loss},
+                    "training_timestamp": datetime.now().isoformat(),  # Add training completion timestamp
+                    "training_duration_seconds": time.time() - symbol_start_time,
+                }
+
+                os.makedirs(MODEL_SAVE_DIR, exist_ok=True)
+
+                try:
+                    save_metadata(model_path, symbol, model_metadata)
+                except Exception as e:
+                    self.logger.error(
+                        f"Error saving metadata for {symbol}: {str(e)}"
+                    )
+                    raise  
+
+                self.logger.info(
+                    f"✅ Saved metadata for {symbol} with training timestamp"
+                )
+
+                self.logger.info(
+                    f"""✨ {symbol} Direction Model Results:
+                    Accuracy: {dir_accuracy:.4f}
+                    Loss: {dir_loss:.4f}"""
+                )
+
+                self.logger.info(
+                    f"""📈 {symbol} Return Model Results:
+                    MAE: {ret_mae:.4f}
+                    Loss: {ret_loss:.4f}"""
+                )
+
+                training_time = time.time() - symbol_start_time
+                self.logger.info(
+                    f"""✅ {symbol} Training Complete:
+                    Time: {training_time:.2f} seconds"""
+                )
+                return "trained", {
+                    "time": training_time,
+                    "accuracy": dir_accuracy,
+                    "mae": ret_mae
+                }
+
+            except Exception as e:
+                self.logger.error(
+                    f"""💥 Training Error - {symbol}:
+                    Error: {str(e)}""",
+                    exc_info=True,
+                )
+                return "failed", None
+
+        except Exception as e:
+            self.logger.error(
+                f"""🚨 Process Error - {symbol}:
+                Error: {str(e)}""",
+                exc_info=True,
+            )
+            return "failed", None
+
 
 if __name__ == "__main__":
     # Initialize MT5 connection
@@ -1,23 +1,133 @@
 # models/trading_state.py
 
-from collections import defaultdict
+import numpy as np
+from collections import defaultdict, deque
+from itertools import islice
 from config import TRADING_CONFIG
 
+# State timestamps come from time.monotonic_ns()
+NS_PER_SECOND = 1_000_000_000
+
+
+class RateCache:
+    """Recent bars for one symbol, kept as separate fixed-capacity arrays"""
+
+    FIELDS = ("time", "open", "high", "low", "close")
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.size = 0
+        self.time = np.zeros(capacity, dtype=np.int64)
+        self.open = np.zeros(capacity)
+        self.high = np.zeros(capacity)
+        self.low = np.zeros(capacity)
+        self.close = np.zeros(capacity)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, field):
+        """Return the filled part of a field, like a structured rates array"""
+        return getattr(self, field)[: self.size]
+
+    def load(self, rates):
+        """Replace the cached bars with a full MT5 rates array"""
+        rates = rates[-self.capacity :]
+        self.size = len(rates)
+        for field in self.FIELDS:
+            getattr(self, field)[: self.size] = rates[field]
+
+    def merge(self, rates):
+        """Overwrite the forming bar and append newer ones.
+
+        Returns False when the fetched bars do not overlap the cache, in which
+        case the caller has to reload the full window.
+        """
+        if self.size == 0 or len(rates) == 0:
+            return False
+
+        start = int(np.searchsorted(self.time[: self.size], rates["time"][0]))
+        if start == self.size or self.time[start] != rates["time"][0]:
+            return False
+
+        end = start + len(rates)
+        overflow = end - self.capacity
+        if overflow > 0:
+            # Drop the oldest bars to make room for the new ones
+            for field in self.FIELDS:
+                values = getattr(self, field)
+                values[: start - overflow] = values[overflow:start]
+            start -= overflow
+            end -= overflow
+
+        for field in self.FIELDS:
+            getattr(self, field)[start:end] = rates[field]
+        self.size = end
+        return True
+
+
 class SymbolState:
+    __slots__ = (
+        "trades_history",
+        "consecutive_losses",
+        "total_profit",
+        "max_profit",
+        "is_restricted",
+        "last_trade_ns",
+        "win_rate",
+        "win_buf",
+        "last10_wins",
+        "volume",
+        "trades_count",
+        "profit_threshold",
+        "trade_direction_memory_size",
+        "recent_trade_directions",
+        "dir_counts",
+        "neutral_start_ns",
+        "rate_cache",
+    )
+
     def __init__(self):
-        self.trades_history = []
+        self.trades_history = deque(maxlen=100)  # Profits of the latest trades
         self.consecutive_losses = 0
         self.total_profit = 0
         self.max_profit = 0
         self.is_restricted = False
-        self.last_trade_time = None
+        self.last_trade_ns = None
         self.win_rate = 0
+        self.win_buf = deque(maxlen=10)  # Win flags of the last 10 trades
+        self.last10_wins = 0
         self.volume = TRADING_CONFIG.INITIAL_VOLUME
         self.trades_count = 0
         self.profit_threshold = TRADING_CONFIG.MIN_PROFIT_THRESHOLD
-        self.recent_trade_directions = []  # Track last few trade directions
         self.trade_direction_memory_size = 5  # Remember last 5 trades
-        self.neutral_start_time = None
+        self.recent_trade_directions = deque(
+            maxlen=self.trade_direction_memory_size
+        )  # Track last few trade directions
+        self.dir_counts = {"buy": 0, "sell": 0}  # Counts within recent_trade_directions
+        self.neutral_start_ns = None
+        self.rate_cache = RateCache()
+
+    def record_trade_direction(self, direction):
+        """Remember a trade direction, keeping dir_counts in step with the deque"""
+        directions = self.recent_trade_directions
+        if len(directions) == directions.maxlen:
+            self.dir_counts[directions[0]] -= 1
+        directions.append(direction)
+        self.dir_counts[direction] += 1
+
+    def update_win_rate(self, profit):
+        """Update the last-10-trades win rate with one closed trade"""
+        new_win = profit > 0
+        if len(self.win_buf) == self.win_buf.maxlen:
+            self.last10_wins -= self.win_buf[0]
+        self.win_buf.append(new_win)
+        self.last10_wins += new_win
+        self.win_rate = self.last10_wins / len(self.win_buf)
+
+    def recent_trades(self, count):
+        """Profits of the last `count` trades, most recent first"""
+        return list(islice(reversed(self.trades_history), count))
 
 
 class TAParams:
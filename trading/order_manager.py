@@ -1,14 +1,28 @@
 # trading/order_manager.py
 
 import logging
-from config import mt5, TRADING_CONFIG, update_risk_profile
+from config import mt5, TRADING_CONFIG
 
 from logging_config import setup_comprehensive_logging
 setup_comprehensive_logging()
 
-#update_risk_profile('AGGRESSIVE')
-# update_risk_profile('MODERATE')
-# update_risk_profile('CONSERVATIVE')
+# Fields shared by every request; per-order values are filled into a copy
+_OPEN_ORDER_TEMPLATE = {
+    "action": mt5.TRADE_ACTION_DEAL,
+    "deviation": TRADING_CONFIG.PRICE_DEVIATION_POINTS,
+    "magic": TRADING_CONFIG.ORDER_MAGIC_NUMBER,
+    "comment": "python",
+    "type_time": mt5.ORDER_TIME_GTC,
+}
+
+_CLOSE_ORDER_TEMPLATE = {
+    "action": mt5.TRADE_ACTION_DEAL,
+    "deviation": 50,  # Increased deviation for better fill probability
+    "magic": 234000,
+    "comment": "close position",
+    "type_time": mt5.ORDER_TIME_GTC,
+    "type_filling": mt5.ORDER_FILLING_IOC,
+}
 
 
 class OrderManager:
@@ -33,9 +47,8 @@ class OrderManager:
         self.logger.info(f"✅ Symbol {symbol} validated successfully")
         return True
 
-    def _get_valid_filling_mode(self, symbol):
+    def _get_valid_filling_mode(self, symbol, symbol_info):
         """Get valid filling mode for symbol based on execution mode"""
-        symbol_info = mt5.symbol_info(symbol)
         if not symbol_info:
             self.logger.error(f"❌ Cannot get symbol info for {symbol}")
             return None
@@ -223,37 +236,25 @@ class OrderManager:
 
     def _create_order_request(self, symbol, direction, volume, price, sl, tp, filling_type):
         """Create an order request with specified parameters"""
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": symbol,
-            "volume": volume,
-            "type": mt5.ORDER_TYPE_BUY if direction == "buy" else mt5.ORDER_TYPE_SELL,
-            "price": price,
-            "sl": sl,
-            "tp": tp,
-            "deviation": TRADING_CONFIG.PRICE_DEVIATION_POINTS, 
-            "magic": TRADING_CONFIG.ORDER_MAGIC_NUMBER,
-            "comment": "python",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": filling_type,
-        }
+        request = _OPEN_ORDER_TEMPLATE.copy()
+        request.update(
+            symbol=symbol,
+            volume=volume,
+            type=mt5.ORDER_TYPE_BUY if direction == "buy" else mt5.ORDER_TYPE_SELL,
+            price=price,
+            sl=sl,
+            tp=tp,
+            type_filling=filling_type,
+        )
 
         self.logger.debug(f"📝 Created order request: {request}")
         return request
 
-    def _calculate_safe_volume(self, symbol, direction, price, available_margin):
+    def _calculate_safe_volume(
+        self, symbol, direction, price, available_margin, symbol_info, account_info
+    ):
         """Calculate safe trading volume based on available margin and risk parameters"""
         try:
-            symbol_info = mt5.symbol_info(symbol)
-            if not symbol_info:
-                self.logger.error(f"Cannot get symbol info for {symbol}")
-                return None
-
-            account_info = mt5.account_info()
-            if not account_info:
-                self.logger.error("Cannot get account info")
-                return None
-
             # Get symbol trading parameters
             contract_size = symbol_info.trade_contract_size
             margin_rate = 1 / account_info.leverage
@@ -370,6 +371,8 @@ class OrderManager:
             direction,
             tick.ask if direction == "buy" else tick.bid,
             account_info.margin_free,
+            symbol_info,
+            account_info,
         )
 
         if safe_volume is None:
@@ -381,7 +384,7 @@ class OrderManager:
             return False
 
         # Get valid filling mode
-        filling_mode = self._get_valid_filling_mode(symbol)
+        filling_mode = self._get_valid_filling_mode(symbol, symbol_info)
         if not filling_mode:
             return False
 
@@ -463,25 +466,15 @@ class OrderManager:
                 )
                 return False
 
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "position": position.ticket,
-                "symbol": position.symbol,
-                "volume": position.volume,
-                "type": (
-                    mt5.ORDER_TYPE_SELL
-                    if position.type == mt5.ORDER_TYPE_BUY
-                    else mt5.ORDER_TYPE_BUY
-                ),
-                "price": (
-                    tick.bid if position.type == mt5.ORDER_TYPE_BUY else tick.ask
-                ),
-                "deviation": 50,  # Increased deviation for better fill probability
-                "magic": 234000,
-                "comment": "close position",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
+            is_buy = position.type == mt5.ORDER_TYPE_BUY
+            request = _CLOSE_ORDER_TEMPLATE.copy()
+            request.update(
+                position=position.ticket,
+                symbol=position.symbol,
+                volume=position.volume,
+                type=mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY,
+                price=tick.bid if is_buy else tick.ask,
+            )
 
             self.logger.debug(
                 f"""
@@ -1,16 +1,90 @@
 # trading/position_manager.py
 
 import logging
-from datetime import datetime
-from config import mt5, TRADING_CONFIG, MT5Config, update_risk_profile
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from enum import Enum
+import numpy as np
+from config import mt5, TRADING_CONFIG, MT5Config
+from ml.features.indicator_kernels import mean_true_range
 
 from logging_config import setup_comprehensive_logging
 
 setup_comprehensive_logging()
 
-#update_risk_profile('AGGRESSIVE')
-# update_risk_profile('MODERATE')
-# update_risk_profile('CONSERVATIVE')
+
+class PositionAction(Enum):
+    HOLD = "hold"
+    CLOSE_AGED = "close_aged"
+    CLOSE_LOSS = "close_loss"
+    CLOSE_PROFIT = "close_profit"
+    REVERSE = "reverse"
+
+
+_CLOSE_MESSAGES = {
+    PositionAction.CLOSE_AGED: "Closed aged position %s with negative profit",
+    PositionAction.CLOSE_LOSS: "Closed position %s due to significant loss",
+    PositionAction.CLOSE_PROFIT: "Closed position %s to lock in profits",
+}
+
+
+# One row of trailing-stop state per open position
+_TRAIL_DTYPE = np.dtype(
+    [
+        ("ticket", np.int64),
+        ("highest_price", np.float64),
+        ("lowest_price", np.float64),
+        ("max_profit", np.float64),
+        ("profit_locked", np.bool_),
+        ("breakeven_set", np.bool_),
+    ]
+)
+
+
+# Bars fetched per symbol: the volatility range uses all, the trailing ATR the last 14
+_RATES_WINDOW = 20
+_ATR_BARS = 14
+
+# Trailing distance tiers: profit pips above each bound trail tighter (in ATRs)
+_TRAIL_PIP_TIERS = (10, 20, 30)
+_TRAIL_ATR_MULTIPLIERS = (1.5, 1.0, 0.75, 0.5)
+
+
+# Close thresholds; risk profiles never change these config values
+_MAX_POSITION_AGE = TRADING_CONFIG.MAX_POSITION_AGE_SECONDS
+_MAX_LOSS_CLOSE = -50.80  # Close losing positions at max loss
+_TAKE_PROFIT_CLOSE = 30  # Lock in profits when they reach this level
+_REVERSAL_THRESHOLD = TRADING_CONFIG.POSITION_REVERSAL_THRESHOLD
+
+
+def decide_position_action(position_age, profit):
+    """Pick the single close action for a position, or HOLD"""
+    if position_age >= _MAX_POSITION_AGE and profit < 0:
+        return PositionAction.CLOSE_AGED
+    if profit <= _MAX_LOSS_CLOSE:
+        return PositionAction.CLOSE_LOSS
+    if profit >= _TAKE_PROFIT_CLOSE:
+        return PositionAction.CLOSE_PROFIT
+    if profit <= _REVERSAL_THRESHOLD:
+        return PositionAction.REVERSE
+    return PositionAction.HOLD
+
+
+def best_stop_loss(position, proposals):
+    """Tightest proposed stop loss that improves on the position's, or None"""
+    proposals = [sl for sl in proposals if sl is not None]
+    if not proposals:
+        return None
+
+    # MT5 reports an unset stop loss as 0.0
+    if position.type == mt5.ORDER_TYPE_BUY:
+        best = max(proposals)
+        improves = not position.sl or best > position.sl
+    else:
+        best = min(proposals)
+        improves = not position.sl or best < position.sl
+    return best if improves else None
 
 
 class PositionManager:
@@ -18,116 +92,138 @@ class PositionManager:
         self.logger = logging.getLogger(__name__)
         self.order_manager = order_manager
         self.risk_manager = risk_manager
-        self.trailing_stops = {}
-
-    def manage_open_positions(self, symbol, trading_state, trading_stats=None):
-        """Comprehensive position management with advanced features"""
-        positions = mt5.positions_get(symbol=symbol)
+        self._trail_arr = np.empty(0, dtype=_TRAIL_DTYPE)
+        self._trail_idx = {}  # ticket -> row in _trail_arr
+        self._trail_tickets = defaultdict(set)  # symbol -> tickets with a row
+        self._rates_cache = {}  # symbol -> (bar close time, latest rates)
+        self._trail_cache = {}  # symbol -> (bar open time, trail distances)
+        self._breakeven_cache = {}  # symbol -> (point, plus offset, buffer offset)
+        self._trail_fns = {
+            mt5.ORDER_TYPE_BUY: self._trail_buy,
+            mt5.ORDER_TYPE_SELL: self._trail_sell,
+        }
+
+    def manage_open_positions(self, symbol, state, trading_stats=None, positions=None):
+        """Comprehensive position management with advanced features.
+
+        Returns True when any trade request was sent, so callers holding a
+        positions snapshot know it is out of date.
+        """
+        if positions is None:
+            positions = mt5.positions_get(symbol=symbol)
+        self._prune_trails(symbol, {position.ticket for position in positions or ()})
         if not positions:
-            return
+            return False
+
+        acted = False
 
-        state = trading_state.symbol_states[symbol]
+        now = time.time()
+
+        # Symbol metadata and quotes are shared by every position this tick,
+        # and only fetched once a position in profit needs them
+        symbol_info = tick = None
 
         for position in positions:
-            self._check_position_age(position)
-            self._manage_position_profit(position, symbol, state, trading_stats)
-            self._manage_breakeven_plus(position, symbol)
-            self._enhanced_trailing_stop(position, symbol)
-            self._check_reversal_conditions(position, symbol, state, trading_stats)
-
-    def _manage_breakeven_plus(self, position, symbol):
-        """Move stop loss to break-even plus additional pips once in sufficient profit"""
+            # position.time is broker-provided unix seconds
+            action = decide_position_action(now - position.time, position.profit)
+            if action is PositionAction.HOLD:
+                if position.profit <= 0:
+                    continue  # Nothing to protect or trail on a losing position
+
+                if tick is None:
+                    symbol_info = mt5.symbol_info(symbol)
+                    tick = mt5.symbol_info_tick(symbol)
+
+                closed, trailing_sl = self._enhanced_trailing_stop(
+                    position, symbol, symbol_info, tick
+                )
+                if closed:
+                    acted = True
+                    continue  # Closed to protect profits; its stop is gone too
+
+                # Both managers only propose a stop; at most one SLTP request is sent
+                new_sl = best_stop_loss(
+                    position,
+                    (self._manage_breakeven_plus(position, symbol_info), trailing_sl),
+                )
+                if new_sl is not None:
+                    self._modify_stop_loss(position, new_sl)
+                    acted = True
+                continue
+
+            acted = True
+            if not self.order_manager.close_position(position):
+                continue
+
+            if action is PositionAction.REVERSE:
+                self._reverse_position(position, symbol, state, trading_stats, tick)
+            else:
+                self.logger.info(_CLOSE_MESSAGES[action], position.ticket)
+
+        return acted
+
+    def _manage_breakeven_plus(self, position, symbol_info):
+        """Propose a break-even plus stop loss once in sufficient profit"""
         try:
             # Only proceed if position is in profit
             if position.profit <= 0:
-                return
+                return None
 
-            # Get symbol info for pip calculations
-            symbol_info = mt5.symbol_info(symbol)
             if not symbol_info:
-                return
+                return None
 
             # Calculate point value and profit in pips
             point = symbol_info.point
             profit_pips = position.profit / (point * position.volume)
+            plus_offset, buffer_offset = self._breakeven_offsets(position.symbol, point)
+            direction = 1 if position.type == mt5.ORDER_TYPE_BUY else -1
 
             # Define the breakeven level based on profit condition
             breakeven_plus = None
-            
+
             if profit_pips >= 20:  # Higher threshold with more protective pips
                 # Calculate break-even level plus configured pips
-                breakeven_plus = position.price_open + (
-                    TRADING_CONFIG.BREAKEVEN_PLUS_PIPS * point if position.type == mt5.ORDER_TYPE_BUY 
-                    else -TRADING_CONFIG.BREAKEVEN_PLUS_PIPS * point
-                )
+                breakeven_plus = position.price_open + direction * plus_offset
             elif position.profit > 10:  # Lower threshold with tighter protection
                 # Calculate break-even level plus 2 pips
-                breakeven_plus = position.price_open + (
-                    2 * point if position.type == mt5.ORDER_TYPE_BUY 
-                    else -2 * point
-                )
-
-            # Only modify if breakeven level was set and new stop loss is better than existing
-            if breakeven_plus and (
-                position.sl is None
-                or (position.type == mt5.ORDER_TYPE_BUY and breakeven_plus > position.sl)
-                or (position.type == mt5.ORDER_TYPE_SELL and breakeven_plus < position.sl)
-            ):
-                self._modify_stop_loss(position, breakeven_plus)
-                self.logger.info(
-                    f"""
-                    ✅ Set break-even plus for {position.symbol}:
-                    🎫 Ticket: {position.ticket}
-                    💰 Profit Pips: {profit_pips:.1f}
-                    🛑 New SL: {breakeven_plus}
-                    """
-                )
+                breakeven_plus = position.price_open + direction * buffer_offset
+
+            # Only propose if breakeven level was set and is better than the existing stop
+            if breakeven_plus and best_stop_loss(position, (breakeven_plus,)) is not None:
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        """
+                    ✅ Break-even plus reached for %s:
+                    🎫 Ticket: %s
+                    💰 Profit Pips: %.1f
+                    🛑 Proposed SL: %s
+                    """,
+                        position.symbol,
+                        position.ticket,
+                        profit_pips,
+                        breakeven_plus,
+                    )
+                return breakeven_plus
 
         except Exception as e:
             self.logger.error(f"Error in break-even plus management: {e}")
+        return None
+
+    def _enhanced_trailing_stop(self, position, symbol, symbol_info, tick):
+        """Propose a trailing stop loss, closing the position if profit falls off its peak.
 
-    def _enhanced_trailing_stop(self, position, symbol):
-        """Advanced trailing stop with more aggressive profit protection"""
+        Returns (closed, proposed stop loss); no stop is proposed once closed.
+        """
         try:
-            # Get current market price
-            tick = mt5.symbol_info_tick(symbol)
-            if not tick:
-                return
-
-            # Calculate ATR
-            rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, 14)
-            if rates is None:
-                return
-
-            import pandas as pd
-            import numpy as np
-
-            df = pd.DataFrame(rates)
-            df["tr"] = np.maximum(
-                df["high"] - df["low"],
-                np.maximum(
-                    abs(df["high"] - df["close"].shift(1)),
-                    abs(df["low"] - df["close"].shift(1))
-                )
-            )
-            atr = df["tr"].mean()
+            if not tick or not symbol_info:
+                return False, None
 
             current_price = tick.bid if position.type == mt5.ORDER_TYPE_BUY else tick.ask
             position_id = position.ticket
 
-            # Initialize trailing data if not exists
-            if position_id not in self.trailing_stops:
-                self.trailing_stops[position_id] = {
-                    "highest_price": current_price if position.type == mt5.ORDER_TYPE_BUY else float("inf"),
-                    "lowest_price": current_price if position.type == mt5.ORDER_TYPE_SELL else float("-inf"),
-                    "max_profit": 0,
-                    "profit_locked": False
-                }
-
-            trail_data = self.trailing_stops[position_id]
+            trail_data = self._get_or_init_trail(position, symbol, current_price)
             
             # Calculate profit in pips
-            symbol_info = mt5.symbol_info(symbol)
             point = symbol_info.point
             profit_pips = position.profit / (point * position.volume)
 
@@ -135,62 +231,145 @@ class PositionManager:
             trail_data["max_profit"] = max(trail_data["max_profit"], position.profit)
             
             # Early profit protection - move stop loss to break even + small buffer
-            if profit_pips >= 10 and not trail_data.get("breakeven_set", False):  # Reduced from 15 to 10 pips
+            if profit_pips >= 10 and not trail_data["breakeven_set"]:  # Reduced from 15 to 10 pips
+                buffer_offset = self._breakeven_offsets(symbol, point)[1]
                 breakeven_level = position.price_open + (
-                    2 * point if position.type == mt5.ORDER_TYPE_BUY else -2 * point
+                    buffer_offset if position.type == mt5.ORDER_TYPE_BUY else -buffer_offset
                 )
-                self._modify_stop_loss(position, breakeven_level)
                 trail_data["breakeven_set"] = True
-                return
+                return False, breakeven_level
 
             # Progressive trailing stop based on profit level
-            if position.type == mt5.ORDER_TYPE_BUY:
-                if current_price > trail_data["highest_price"]:
-                    trail_data["highest_price"] = current_price
-                    
-                    # Tighter trailing stops as profit increases
-                    if profit_pips > 30:
-                        trail_distance = atr * 0.5  # Very tight trail for large profits
-                    elif profit_pips > 20:
-                        trail_distance = atr * 0.75  # Tighter trail for medium profits
-                    elif profit_pips > 10:
-                        trail_distance = atr * 1.0  # Standard trail for small profits
-                    else:
-                        trail_distance = atr * 1.5  # Wide trail initially
-
-                    new_sl = current_price - trail_distance
-                    
-                    if not position.sl or new_sl > position.sl:
-                        self._modify_stop_loss(position, new_sl)
-
-            else:  # SELL position
-                if current_price < trail_data["lowest_price"]:
-                    trail_data["lowest_price"] = current_price
-                    
-                    if profit_pips > 30:
-                        trail_distance = atr * 0.5
-                    elif profit_pips > 20:
-                        trail_distance = atr * 0.75
-                    elif profit_pips > 10:
-                        trail_distance = atr * 1.0
-                    else:
-                        trail_distance = atr * 1.5
-
-                    new_sl = current_price + trail_distance
-                    
-                    if not position.sl or new_sl < position.sl:
-                        self._modify_stop_loss(position, new_sl)
+            trail = self._trail_fns[position.type]
+            new_sl = trail(symbol, tick, current_price, trail_data, profit_pips)
 
             # Profit protection - close position if profit drops significantly from peak
             max_profit = trail_data["max_profit"]
             if max_profit > 0:
                 profit_drawdown = (max_profit - position.profit) / max_profit
-                if profit_drawdown >= 0.75 and position.profit > 0:  # Close if we've lost 75% of max profit
-                    self.order_manager.close_position(position)
-                    self.logger.info(f"Closed position {position_id} to protect profits. Max profit: {max_profit}, Current profit: {position.profit}")
+                # Close if we've lost 75% of max profit
+                if (
+                    profit_drawdown >= 0.75
+                    and position.profit > 0
+                    and self.order_manager.close_position(position)
+                ):
+                    self.logger.info(
+                        "Closed position %s to protect profits. Max profit: %s, Current profit: %s",
+                        position_id,
+                        max_profit,
+                        position.profit,
+                    )
+                    return True, None
+
+            return False, new_sl
 
         except Exception as e:
             self.logger.error(f"Error in enhanced trailing stop management: {e}")
+        return False, None
+
+    def _breakeven_offsets(self, symbol, point):
+        """Break-even plus and 2-pip buffer offsets in price units, cached per symbol"""
+        cached = self._breakeven_cache.get(symbol)
+        if cached is None or cached[0] != point:
+            cached = (point, TRADING_CONFIG.BREAKEVEN_PLUS_PIPS * point, 2 * point)
+            self._breakeven_cache[symbol] = cached
+        return cached[1], cached[2]
+
+    def _get_or_init_trail(self, position, symbol, current_price):
+        """Trailing-stop row for a position, created on first sight.
+
+        The returned record is a view, so writes to it update _trail_arr.
+        """
+        row = self._trail_idx.get(position.ticket)
+        if row is None:
+            is_buy = position.type == mt5.ORDER_TYPE_BUY
+            entry = np.zeros(1, dtype=_TRAIL_DTYPE)
+            entry["ticket"] = position.ticket
+            entry["highest_price"] = current_price if is_buy else float("inf")
+            entry["lowest_price"] = current_price if not is_buy else float("-inf")
+            row = len(self._trail_arr)
+            self._trail_arr = np.concatenate((self._trail_arr, entry))
+            self._trail_idx[position.ticket] = row
+            self._trail_tickets[symbol].add(position.ticket)
+        return self._trail_arr[row]
+
+    def _prune_trails(self, symbol, live_tickets):
+        """Drop trailing rows of this symbol's positions that are no longer open"""
+        closed = self._trail_tickets[symbol] - live_tickets
+        if not closed:
+            return
+
+        keep = ~np.isin(self._trail_arr["ticket"], list(closed))
+        self._trail_arr = self._trail_arr[keep]
+        self._trail_idx = {
+            int(ticket): row for row, ticket in enumerate(self._trail_arr["ticket"])
+        }
+        self._trail_tickets[symbol] -= closed
+
+    def _trail_buy(self, symbol, tick, current_price, trail_data, profit_pips):
+        """Trailing stop below a new high for a buy position, or None"""
+        if current_price <= trail_data["highest_price"]:
+            return None
+        trail_data["highest_price"] = current_price
+
+        # ATR is only needed on ticks that make a new high
+        distances = self._get_trail_distances(symbol, tick)
+        if distances is None:
+            return None
+        # Tighter trailing stops as profit increases
+        return current_price - distances[bisect_left(_TRAIL_PIP_TIERS, profit_pips)]
+
+    def _trail_sell(self, symbol, tick, current_price, trail_data, profit_pips):
+        """Trailing stop above a new low for a sell position, or None"""
+        if current_price >= trail_data["lowest_price"]:
+            return None
+        trail_data["lowest_price"] = current_price
+
+        distances = self._get_trail_distances(symbol, tick)
+        if distances is None:
+            return None
+        return current_price + distances[bisect_left(_TRAIL_PIP_TIERS, profit_pips)]
+
+    def _get_recent_rates(self, symbol, tick=None):
+        """Latest bars for a symbol, reused until the current bar closes.
+
+        Without a tick the cache cannot be checked, so the bars are refetched.
+        """
+        cached = self._rates_cache.get(symbol)
+        if cached is not None and tick is not None and tick.time < cached[0]:
+            return cached[1]
+
+        rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, _RATES_WINDOW)
+        if rates is None or len(rates) == 0:
+            return None
+
+        if len(rates) >= 2:
+            # Market gaps only widen the spacing, so the smallest step is one bar
+            times = rates["time"]
+            bar_close = int(times[-1]) + int(np.diff(times).min())
+            self._rates_cache[symbol] = (bar_close, rates)
+        return rates
+
+    def _get_trail_distances(self, symbol, tick):
+        """Trailing distance per profit tier from the 14-bar ATR, computed once per bar"""
+        rates = self._get_recent_rates(symbol, tick)
+        if rates is None or len(rates) < 2:
+            return None
+
+        bar_time = int(rates["time"][-1])
+        cached = self._trail_cache.get(symbol)
+        if cached is not None and cached[0] == bar_time:
+            return cached[1]
+
+        rates = rates[-_ATR_BARS:]
+        atr = mean_true_range(
+            np.ascontiguousarray(rates["high"], dtype=np.float64),
+            np.ascontiguousarray(rates["low"], dtype=np.float64),
+            np.ascontiguousarray(rates["close"], dtype=np.float64),
+        )
+        distances = tuple(atr * multiplier for multiplier in _TRAIL_ATR_MULTIPLIERS)
+        self._trail_cache[symbol] = (bar_time, distances)
+        return distances
 
     def _modify_stop_loss(self, position, new_sl):
         """Modify stop loss level for a position"""
@@ -206,14 +385,18 @@ class PositionManager:
             result = mt5.order_send(request)
 
             if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-                self.logger.info(
-                    f"""
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        """
                     ✅ Successfully modified stop loss:
-                    🎫 Ticket: {position.ticket}
-                    🛑 New SL: {new_sl}
-                    💰 Current Profit: {position.profit}
-                """
-                )
+                    🎫 Ticket: %s
+                    🛑 New SL: %s
+                    💰 Current Profit: %s
+                """,
+                        position.ticket,
+                        new_sl,
+                        position.profit,
+                    )
             else:
                 self.logger.warning(
                     f"""
@@ -226,61 +409,30 @@ class PositionManager:
         except Exception as e:
             self.logger.error(f"Error modifying stop loss: {e}")
 
-    def _check_position_age(self, position):
-        """Monitor position duration and take action if needed"""
-        position_age = (
-            datetime.now() - datetime.fromtimestamp(position.time)
-        ).total_seconds()
-
-        if position_age >= TRADING_CONFIG.MAX_POSITION_AGE_SECONDS and position.profit < 0:
-            if self.order_manager.close_position(position):
-                self.logger.info(
-                    f"Closed aged position {position.ticket} with negative profit"
-                )
-
-    def _manage_position_profit(self, position, symbol, state, trading_stats):
-        """Monitor and manage position profit/loss"""
-        # Close losing positions at max loss
-        if position.profit <= -50.80:
-            if self.order_manager.close_position(position):
-                self.logger.info(f"Closed position {position.ticket} due to significant loss")
-                
-        # Lock in profits when they reach certain thresholds
-        elif position.profit >= 30:  # Add profit taking
-            if self.order_manager.close_position(position):
-                self.logger.info(f"Closed position {position.ticket} to lock in profits")
-
-    def _check_reversal_conditions(self, position, symbol, state, trading_stats):
-        """Check and execute position reversal if conditions are met"""
-        if position.profit <= TRADING_CONFIG.POSITION_REVERSAL_THRESHOLD:
-            if self.order_manager.close_position(position):
-                reversal_direction = (
-                    "sell" if position.type == mt5.ORDER_TYPE_BUY else "buy"
-                )
-
-                # Get market conditions for reversal
-                atr = self._get_market_volatility(symbol)
-                if atr:
-                    success = self.order_manager.place_order(
-                        symbol,
-                        reversal_direction,
-                        atr,
-                        state.volume * 1.5,  # Increase volume for reversal
-                        trading_stats,
-                    )
+    def _reverse_position(self, position, symbol, state, trading_stats, tick=None):
+        """Open the opposite trade after a position was closed for reversal"""
+        reversal_direction = "sell" if position.type == mt5.ORDER_TYPE_BUY else "buy"
+
+        # Get market conditions for reversal
+        atr = self._get_market_volatility(symbol, tick)
+        if atr:
+            success = self.order_manager.place_order(
+                symbol,
+                reversal_direction,
+                atr,
+                state.volume * 1.5,  # Increase volume for reversal
+                trading_stats,
+            )
 
-                    if success:
-                        self.logger.info(f"Successfully reversed position for {symbol}")
-                        if trading_stats:
-                            trading_stats.log_position_reversal(symbol)
+            if success:
+                self.logger.info("Successfully reversed position for %s", symbol)
+                if trading_stats:
+                    trading_stats.log_position_reversal(symbol)
 
-    def _get_market_volatility(self, symbol):
+    def _get_market_volatility(self, symbol, tick=None):
         """Calculate current market volatility"""
-        rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, 20)
+        rates = self._get_recent_rates(symbol, tick)
         if rates is None:
             return None
 
-        import pandas as pd
-
-        df = pd.DataFrame(rates)
-        return df["high"].max() - df["low"].min()
+        return float(rates["high"].max() - rates["low"].min())
@@ -1,25 +1,20 @@
 # trading/risk_manager.py
 
 import logging
-from datetime import datetime, timedelta
-from config import TRADING_CONFIG, update_risk_profile
-from models.trading_state import trading_state
+import time
+from config import TRADING_CONFIG
+from models.trading_state import trading_state, NS_PER_SECOND
 
 from logging_config import setup_comprehensive_logging
 setup_comprehensive_logging()
 
-#update_risk_profile('AGGRESSIVE')
-# update_risk_profile('MODERATE')
-# update_risk_profile('CONSERVATIVE')
 
 class RiskManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def should_trade_symbol(self, symbol):
+    def should_trade_symbol(self, state):
         """Determine if a symbol should be traded based on risk parameters"""
-        state = trading_state.symbol_states[symbol]
-
         # Check if symbol is restricted
         if state.is_restricted:
             return False
@@ -31,16 +26,16 @@ class RiskManager:
         # Check win rate
         if state.trades_count > 10 and state.win_rate < TRADING_CONFIG.MIN_WIN_RATE:
             # Allow trading again after cooling period
-            cooling_period = (datetime.now() - state.last_trade_time).total_seconds()
-            if cooling_period < TRADING_CONFIG.COOLING_PERIOD_SECONDS:
+            cooling_period = time.monotonic_ns() - state.last_trade_ns
+            if cooling_period < TRADING_CONFIG.COOLING_PERIOD_SECONDS * NS_PER_SECOND:
                 return False
 
         # Check recent performance
         if state.trades_history:
-            recent_trades = state.trades_history[-3:]
+            recent_trades = state.recent_trades(3)
             if sum(1 for profit in recent_trades if profit < 0) >= 2:
-                cooling_period = (datetime.now() - state.last_trade_time).total_seconds()
-                if cooling_period < TRADING_CONFIG.COOLING_PERIOD_SECONDS:
+                cooling_period = time.monotonic_ns() - state.last_trade_ns
+                if cooling_period < TRADING_CONFIG.COOLING_PERIOD_SECONDS * NS_PER_SECOND:
                     return False
 
         # Check global account risk
@@ -49,21 +44,12 @@ class RiskManager:
 
         return True
 
-    def calculate_win_rate(self, trades):
-        """Calculate win rate from trade history"""
-        if not trades:
-            return 0
-        winning_trades = sum(1 for profit in trades if profit > 0)
-        return winning_trades / len(trades)
-
-    def adjust_trading_parameters(self, symbol, profit, trading_state):
+    def adjust_trading_parameters(self, state, profit):
         """Dynamically adjust trading parameters based on performance"""
-        state = trading_state.symbol_states[symbol]
-
         # Update trade history
         state.trades_count += 1
         state.trades_history.append(profit)
-        state.recent_trade_directions.append("buy" if profit > 0 else "sell")
+        state.record_trade_direction("buy" if profit > 0 else "sell")
 
         # Reset consecutive losses if profitable
         if profit > 0:
@@ -71,12 +57,8 @@ class RiskManager:
         else:
             state.consecutive_losses += 1
 
-        # Maintain trade direction memory size
-        if len(state.recent_trade_directions) > state.trade_direction_memory_size:
-            state.recent_trade_directions.pop(0)
-
         # Update performance metrics
-        state.win_rate = self.calculate_win_rate(state.trades_history[-10:])
+        state.update_win_rate(profit)
 
         # Volume adjustment
         self._adjust_volume(state)
@@ -1,15 +1,30 @@
 # trading/signal_generator.py
 
 import logging
-import pandas as pd
-from datetime import datetime
+import time
+import numpy as np
 from config import mt5, TRADING_CONFIG, MT5Config
-from models.trading_state import trading_state
-from ml.features.technical_indicators import TechnicalIndicators
+from models.trading_state import trading_state, NS_PER_SECOND
+from ml.features.indicator_kernels import SIGNAL_INDICATORS, compute_signal_state
 
 from logging_config import setup_comprehensive_logging
 setup_comprehensive_logging()
 
+# Oscillator thresholds for the technical vote
+RSI_OVERSOLD = 30.0
+RSI_OVERBOUGHT = 70.0
+STOCH_OVERSOLD = 20.0
+STOCH_OVERBOUGHT = 80.0
+WILLIAMS_OVERSOLD = -80.0
+WILLIAMS_OVERBOUGHT = -20.0
+
+# Extreme levels that add technical signal strength
+RSI_EXTREME_LOW = 25.0
+RSI_EXTREME_HIGH = 75.0
+STOCH_EXTREME_LOW = 15.0
+STOCH_EXTREME_HIGH = 85.0
+
+
 class SignalGenerator:
     def __init__(self, ml_predictor, backtest_mode=False):
         self.logger = logging.getLogger(__name__)
@@ -23,7 +38,9 @@ class SignalGenerator:
         """Generate trading signal based on technical indicators"""
         # RSI signals
         rsi = current_state["RSI"]
-        rsi_signal = "buy" if rsi < 30 else "sell" if rsi > 70 else None
+        rsi_signal = (
+            "buy" if rsi < RSI_OVERSOLD else "sell" if rsi > RSI_OVERBOUGHT else None
+        )
 
         # MACD signals
         macd = current_state["MACD"]
@@ -31,12 +48,16 @@ class SignalGenerator:
 
         # Stochastic signals
         stoch = current_state["Stochastic"]
-        stoch_signal = "buy" if stoch < 20 else "sell" if stoch > 80 else None
+        stoch_signal = (
+            "buy" if stoch < STOCH_OVERSOLD else "sell" if stoch > STOCH_OVERBOUGHT else None
+        )
 
         # Williams %R signals
         williams = current_state["Williams_R"]
         williams_signal = (
-            "buy" if williams < -80 else "sell" if williams > -20 else None
+            "buy"
+            if williams < WILLIAMS_OVERSOLD
+            else "sell" if williams > WILLIAMS_OVERBOUGHT else None
         )
 
         # Count signals in each direction
@@ -87,7 +108,9 @@ class SignalGenerator:
         if tech_signal:
             # RSI extremes increase technical strength
             rsi = current_state["RSI"]
-            if (tech_signal == "buy" and rsi < 25) or (tech_signal == "sell" and rsi > 75):
+            if (tech_signal == "buy" and rsi < RSI_EXTREME_LOW) or (
+                tech_signal == "sell" and rsi > RSI_EXTREME_HIGH
+            ):
                 tech_strength += 1
 
             # MACD divergence increases technical strength
@@ -97,18 +120,21 @@ class SignalGenerator:
 
             # Stochastic extremes increase technical strength
             stoch = current_state["Stochastic"]
-            if (tech_signal == "buy" and stoch < 15) or (tech_signal == "sell" and stoch > 85):
+            if (tech_signal == "buy" and stoch < STOCH_EXTREME_LOW) or (
+                tech_signal == "sell" and stoch > STOCH_EXTREME_HIGH
+            ):
                 tech_strength += 0.5
 
         # Conservative mode adjustments
-        required_strength = 2.5 if trading_state.is_conservative_mode else 2.0
+        conservative = trading_state.is_conservative_mode
+        required_strength = 2.5 if conservative else 2.0
 
         # Calculate total signal strength
         total_strength = ml_strength + tech_strength
 
         # Calculate potential profit based on signal strength and ATR
         potential_profit = current_state["ATR"] * total_strength * 10
-        if trading_state.is_conservative_mode:
+        if conservative:
             potential_profit *= 0.8
 
         # Final signal determination with balanced thresholds
@@ -123,97 +149,111 @@ class SignalGenerator:
 
         return "neutral", 0
 
-    def _check_neutral_hold(self, symbol):
+    def _check_neutral_hold(self, symbol, state):
         """Check if symbol should remain in neutral hold"""
-        state = trading_state.symbol_states[symbol]
-        if state.neutral_start_time:
-            neutral_duration = (
-                datetime.now() - state.neutral_start_time
-            ).total_seconds()
-            if neutral_duration < TRADING_CONFIG.NEUTRAL_HOLD_DURATION:
-                self.logger.info(f"{symbol} still in neutral hold")
+        if state.neutral_start_ns:
+            neutral_duration = time.monotonic_ns() - state.neutral_start_ns
+            if neutral_duration < TRADING_CONFIG.NEUTRAL_HOLD_DURATION * NS_PER_SECOND:
+                self.logger.info("%s still in neutral hold", symbol)
                 return False
-            state.neutral_start_time = None
+            state.neutral_start_ns = None
         return True
 
-    def _check_trade_direction_valid(self, symbol, ml_signal):
+    def _check_trade_direction_valid(self, symbol, state, ml_signal):
         """Check if trade direction is valid based on recent trades"""
-        state = trading_state.symbol_states[symbol]
-        if state.recent_trade_directions:
-            recent_direction_count = state.recent_trade_directions.count(ml_signal)
-            if recent_direction_count >= 2:
-                self.logger.info(
-                    f"{symbol} suppressing {ml_signal} due to recent similar trades"
-                )
-                return False
+        if state.dir_counts.get(ml_signal, 0) >= 2:
+            self.logger.info(
+                "%s suppressing %s due to recent similar trades", symbol, ml_signal
+            )
+            return False
         return True
     
-    def get_signal(self, symbol, current_time=None):
-        """Generate trading signals with multiple confirmation methods"""
-        self.logger.debug(f"🔄 Starting signal generation for {symbol}")
+    def get_signal(self, symbol, current_time=None, state=None, ml_prediction=None):
+        """Generate trading signals with multiple confirmation methods.
+
+        ml_prediction, when given, is a (signal, confidence, return) tuple
+        already computed for this bar; otherwise the predictor is called.
+        """
+        self.logger.debug("🔄 Starting signal generation for %s", symbol)
 
-        if not self._should_trade_symbol(symbol):
+        if state is None:
+            state = trading_state.symbol_states[symbol]
+
+        if not self._should_trade_symbol(state):
             self.logger.info(
-                f"⛔ {symbol} trading restricted - skipping signal generation"
+                "⛔ %s trading restricted - skipping signal generation", symbol
             )
             return None, None, 0
 
         # In backtest mode, we'll use the current_time parameter
         # In live mode, we'll fetch current market data
-        df = (
+        rates = (
             self._get_backtest_data(symbol, current_time) 
             if self.backtest_mode and current_time is not None
-            else self._get_market_data(symbol)
+            else self._get_market_data(symbol, state)
         )
         
-        if df is None:
+        if rates is None:
             self.logger.warning(f"❌ Failed to fetch market data for {symbol}")
             return None, None, 0
 
-        self.logger.debug(f"📊 Retrieved {len(df)} data points for {symbol}")
+        self.logger.debug("📊 Retrieved %d data points for %s", len(rates), symbol)
 
         # Calculate indicators and get current market state
-        current_state = self._calculate_indicators(df)
+        current_state = self._calculate_indicators(rates)
         if current_state is None:
             self.logger.warning(f"⚠️ Failed to calculate indicators for {symbol}")
             return None, None, 0
 
         try:
             # Get ML prediction using the ml_predictor instance
-            self.logger.debug(f"🤖 Getting ML prediction for {symbol}")
-            ml_signal, ml_confidence, ml_predicted_return = self.ml_predictor.predict()
+            self.logger.debug("🤖 Getting ML prediction for %s", symbol)
+            if ml_prediction is None:
+                ml_prediction = self.ml_predictor.predict()
+            ml_signal, ml_confidence, ml_predicted_return = ml_prediction
 
-            self.logger.info(
-                f"""💡 {symbol} ML Prediction:
-                Signal={ml_signal}
-                Confidence={ml_confidence:.4f}
-                Predicted Return={ml_predicted_return:.4f}"""
-            )
-
-            # Check for neutral state
-            if self._check_neutral_state(symbol, ml_confidence, ml_predicted_return):
+            if self.logger.isEnabledFor(logging.INFO):
                 self.logger.info(
-                    f"""⚖️ {symbol} entered NEUTRAL state:
-                    Confidence: {ml_confidence:.4f}
-                    Predicted Return: {ml_predicted_return:.4f}"""
+                    """💡 %s ML Prediction:
+                Signal=%s
+                Confidence=%.4f
+                Predicted Return=%.4f""",
+                    symbol,
+                    ml_signal,
+                    ml_confidence,
+                    ml_predicted_return,
                 )
+
+            # Check for neutral state
+            if self._check_neutral_state(state, ml_confidence, ml_predicted_return):
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info(
+                        """⚖️ %s entered NEUTRAL state:
+                    Confidence: %.4f
+                    Predicted Return: %.4f""",
+                        symbol,
+                        ml_confidence,
+                        ml_predicted_return,
+                    )
                 return "neutral", current_state["ATR"], 0
 
             # Check if symbol is in neutral hold
-            if not self._check_neutral_hold(symbol):
-                self.logger.debug(f"⏸️ {symbol} in neutral hold period")
+            if not self._check_neutral_hold(symbol, state):
+                self.logger.debug("⏸️ %s in neutral hold period", symbol)
                 return None, None, 0
 
             # Trade Direction Repetition Prevention
-            if not self._check_trade_direction_valid(symbol, ml_signal):
+            if not self._check_trade_direction_valid(symbol, state, ml_signal):
                 self.logger.info(
-                    f"🚫 {symbol} - {ml_signal} signal suppressed due to recent trade direction"
+                    "🚫 %s - %s signal suppressed due to recent trade direction",
+                    symbol,
+                    ml_signal,
                 )
                 return None, None, 0
 
             # Generate technical signals
             tech_signal = self._generate_technical_signal(current_state)
-            self.logger.debug(f"📈 {symbol} Technical Signal: {tech_signal}")
+            self.logger.debug("📈 %s Technical Signal: %s", symbol, tech_signal)
 
             # Combine signals for final decision
             final_signal, potential_profit = self._combine_signals(
@@ -226,11 +266,15 @@ class SignalGenerator:
             )
 
             # Final decision logging
-            self.logger.info(
-                f"""✨ {symbol} Final Decision:
-                Signal={final_signal}
-                Potential Profit={potential_profit:.4f}"""
-            )
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    """✨ %s Final Decision:
+                Signal=%s
+                Potential Profit=%.4f""",
+                    symbol,
+                    final_signal,
+                    potential_profit,
+                )
 
             return final_signal, current_state["ATR"], potential_profit
 
@@ -249,44 +293,58 @@ class SignalGenerator:
         final_signal,
     ):
         """Log detailed analysis of signal generation"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self.logger.info(
-            f"""
-            ******** {symbol} Analysis ********
-            ML Signal: {ml_signal}
-            ML Confidence: {ml_confidence:.2f}
-            ML Predicted Return: {ml_predicted_return:.5f}
-            Technical Signal: {tech_signal}
-            Final Signal: {final_signal}
             """
+            ******** %s Analysis ********
+            ML Signal: %s
+            ML Confidence: %.2f
+            ML Predicted Return: %.5f
+            Technical Signal: %s
+            Final Signal: %s
+            """,
+            symbol,
+            ml_signal,
+            ml_confidence,
+            ml_predicted_return,
+            tech_signal,
+            final_signal,
         )
 
-    def _should_trade_symbol(self, symbol):
+    def _should_trade_symbol(self, state):
         """Determine if trading should occur for a symbol based on performance"""
-        state = trading_state.symbol_states[symbol]
-
         # Check recent performance
-        recent_trades = state.trades_history[-3:]
+        recent_trades = state.recent_trades(3)
         if recent_trades:
             if sum(recent_trades) < 0:
-                cooling_period = (
-                    datetime.now() - state.last_trade_time
-                ).total_seconds()
-                if cooling_period < 120:
+                cooling_period = time.monotonic_ns() - state.last_trade_ns
+                if cooling_period < 120 * NS_PER_SECOND:
                     return False
 
         return not state.is_restricted
 
-    def _get_market_data(self, symbol):
-        """Fetch and prepare market data"""
-        rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, 100)
+    def _get_market_data(self, symbol, state):
+        """Fetch the latest bars and merge them into the symbol's rate cache"""
+        cache = state.rate_cache
+
+        # Only the last few bars change between polls
+        rates = mt5.copy_rates_from_pos(symbol, MT5Config.TIMEFRAME, 0, 5)
         if rates is None:
             self.logger.warning(f"No rates available for {symbol}")
             return None
 
-        df = pd.DataFrame(rates)
-        df["time"] = pd.to_datetime(df["time"], unit="s")
-        return df
-    
+        if not cache.merge(rates):
+            rates = mt5.copy_rates_from_pos(
+                symbol, MT5Config.TIMEFRAME, 0, cache.capacity
+            )
+            if rates is None:
+                self.logger.warning(f"No rates available for {symbol}")
+                return None
+            cache.load(rates)
+
+        return cache
+
     def _get_backtest_data(self, symbol, current_time):
         """Fetch historical data for backtesting"""
         # Fetch data up to current_time
@@ -300,28 +358,24 @@ class SignalGenerator:
             self.logger.warning(f"No rates available for {symbol}")
             return None
 
-        df = pd.DataFrame(rates)
-        df["time"] = pd.to_datetime(df["time"], unit="s")
-        return df
+        # Structured MT5 array; indicators read its fields directly
+        return rates
 
-    def _calculate_indicators(self, df):
+    def _calculate_indicators(self, rates):
         """Calculate technical indicators including ATR"""
         try:
-            # Calculate ATR and other indicators using TechnicalIndicators class
-            current_state = {
-                'ATR': TechnicalIndicators.atr(df).iloc[-1],
-                'RSI': TechnicalIndicators.rsi(df['close']).iloc[-1],
-                'MACD': TechnicalIndicators.macd(df['close']).iloc[-1],
-                'Stochastic': TechnicalIndicators.stochastic(df).iloc[-1],
-                'Williams_R': TechnicalIndicators.williams_r(df).iloc[-1],
-                # Add other indicators as needed
-            }            
-            return current_state
+            # ATR, RSI, MACD, Stochastic and Williams %R in one compiled pass
+            values = compute_signal_state(
+                np.ascontiguousarray(rates["high"], dtype=np.float64),
+                np.ascontiguousarray(rates["low"], dtype=np.float64),
+                np.ascontiguousarray(rates["close"], dtype=np.float64),
+            )
+            return dict(zip(SIGNAL_INDICATORS, values))
         except Exception as e:
             self.logger.error(f"Error calculating indicators: {e}")
             return None
 
-    def _check_neutral_state(self, symbol, ml_confidence, ml_predicted_return):
+    def _check_neutral_state(self, state, ml_confidence, ml_predicted_return):
         """Check if symbol should enter neutral state with balanced thresholds"""
         # For sell signals, check confidence relative to 0.5
         adjusted_confidence = ml_confidence
@@ -332,6 +386,6 @@ class SignalGenerator:
             adjusted_confidence <= TRADING_CONFIG.NEUTRAL_CONFIDENCE_THRESHOLD
             or abs(ml_predicted_return) < TRADING_CONFIG.MIN_PREDICTED_RETURN # absolute value for return
         ):
-            trading_state.symbol_states[symbol].neutral_start_time = datetime.now()
+            state.neutral_start_ns = time.monotonic_ns()
             return True
         return False
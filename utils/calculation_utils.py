@@ -3,18 +3,18 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional, List, Union
 from ml.features.feature_engineering import FeatureEngineer
 
 
 def prepare_training_data(
-    df: pd.DataFrame, min_samples: int = 100
+    df: Union[np.ndarray, pd.DataFrame], min_samples: int = 100
 ) -> Tuple[Optional[pd.DataFrame], Optional[pd.Series], Optional[pd.Series]]:
     """
     Prepare data for ML model training
 
     Args:
-        df: Raw price data DataFrame
+        df: Raw MT5 rates (structured array) or price data DataFrame
         min_samples: Minimum number of samples required
 
     Returns:
@@ -26,17 +26,21 @@ def prepare_training_data(
         df.dropna(inplace=True)
 
         logging.info(f"Total data points: {len(df)}")
-        logging.info(
-            f"Class Distribution before filtering: {df['target_direction'].value_counts(normalize=True)}"
-        )
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info(
+                "Class Distribution before filtering: %s",
+                df["target_direction"].value_counts(normalize=True),
+            )
 
         # Filter out neutral cases
         df_filtered = df[df["target_direction"] != 0].copy()
 
         logging.info(f"Data points after filtering: {len(df_filtered)}")
-        logging.info(
-            f"Class Distribution after filtering: {df_filtered['target_direction'].value_counts(normalize=True)}"
-        )
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info(
+                "Class Distribution after filtering: %s",
+                df_filtered["target_direction"].value_counts(normalize=True),
+            )
 
         if len(df_filtered) < min_samples:
             logging.warning(
@@ -96,13 +100,13 @@ def prepare_training_data(
 
 
 def prepare_prediction_data(
-    df: pd.DataFrame, features: List[str]
+    df: Union[np.ndarray, pd.DataFrame], features: List[str]
 ) -> Optional[pd.DataFrame]:
     """
     Prepare data for prediction
 
     Args:
-        df: Raw price data DataFrame
+        df: Raw MT5 rates (structured array) or price data DataFrame
         features: List of feature names used in training
 
     Returns:
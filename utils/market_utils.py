@@ -1,7 +1,9 @@
 # utils/market_utils.py
 
-import pandas as pd
+import numpy as np
 import logging
+import threading
+from collections import defaultdict
 from typing import Optional
 from config import mt5
 import time
@@ -24,7 +26,8 @@ def ensure_mt5_initialized(max_attempts: int = 3, retry_delay: float = 2.0) -> b
 
 def fetch_historical_data(
     symbol: str, timeframe: int, look_back: int
-) -> Optional[pd.DataFrame]:
+) -> Optional[np.ndarray]:
+    """Fetch recent bars as the structured array returned by MT5"""
     try:
         if not mt5.initialize():
             if not ensure_mt5_initialized():
@@ -40,10 +43,59 @@ def fetch_historical_data(
             logging.error(f"Failed to fetch data for {symbol}")
             return None
 
-        df = pd.DataFrame(rates)
-        logging.info(f"Successfully fetched {len(df)} data points for {symbol}")
-        return df
+        logging.info(f"Successfully fetched {len(rates)} data points for {symbol}")
+        return rates
 
     except Exception as e:
         logging.error(f"Error fetching data for {symbol}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+class MarketSnapshot:
+    """Open positions for every symbol, refreshed by a single polling thread.
+
+    Readers may see positions up to poll_interval old; code that closes,
+    opens or modifies positions calls refresh() straight after.
+
+    With an executor, background refreshes run on it so they never overlap
+    other MT5 calls made through the same executor. Callers already running
+    on that executor call refresh() directly.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, executor=None):
+        self.poll_interval = poll_interval
+        self._executor = executor
+        self._positions = {}
+        self._thread = None
+
+    def refresh(self):
+        """Fetch all open positions in one call and group them by symbol"""
+        grouped = defaultdict(list)
+        for position in mt5.positions_get() or ():
+            grouped[position.symbol].append(position)
+        # Swapping the whole dict keeps readers lock-free
+        self._positions = dict(grouped)
+
+    def positions(self, symbol: str) -> tuple:
+        """Open positions for a symbol as of the last refresh"""
+        return tuple(self._positions.get(symbol, ()))
+
+    def start(self, stop_event: threading.Event):
+        """Refresh once, then keep polling in a daemon thread until stopped"""
+        self._refresh_on_executor()
+        self._thread = threading.Thread(
+            target=self._poll, args=(stop_event,), daemon=True
+        )
+        self._thread.start()
+
+    def _poll(self, stop_event: threading.Event):
+        while not stop_event.wait(self.poll_interval):
+            try:
+                self._refresh_on_executor()
+            except Exception as e:
+                logging.error(f"Error refreshing market snapshot: {e}")
+
+    def _refresh_on_executor(self):
+        if self._executor is None:
+            self.refresh()
+        else:
+            self._executor.submit(self.refresh).result()